@@ -0,0 +1,316 @@
+"""Поисковый игрок для «Блок Бласт!».
+
+Перебирает порядки и позиции фигур текущего набора, оценивает итоговые
+позиции подключаемой эвристикой и запоминает оценки в ограниченной таблице
+транспозиций. Следующая раздача не перебирается: вместо этого признак
+placeability оценивает вероятность, что случайная фигура из каталога
+найдёт место на итоговом поле.
+Модуль зависит только от engine.py и работает без PyQt5.
+"""
+import time
+from collections import OrderedDict, namedtuple
+
+from engine import LineMasks, PlacementTable, SHAPE_CATALOG, apply_placement, move_score
+
+
+# Ширина луча для игроков с бюджетом: без неё бюджет кончается на первых
+# ветвях, и лучшими оказываются ходы, до которых поиск успел дойти
+BEAM_WIDTH = 8
+
+
+def popcount(value):
+    return bin(value).count('1')
+
+
+class BoardGeometry:
+    """Маски поля и пробы ориентаций для эвристик; кэшируются по размеру поля"""
+    _cache = {}
+
+    @classmethod
+    def get(cls, size):
+        geometry = cls._cache.get(size)
+        if geometry is None:
+            geometry = cls._cache[size] = cls(size)
+        return geometry
+
+    def __init__(self, size):
+        self.size = size
+        self.masks = LineMasks.get(size)
+        self.full = self.masks.full
+        self.row_masks = self.masks.rows
+        self.col_masks = self.masks.cols
+
+        # Для каждой ориентации: вероятность её выпадения, сдвиги её клеток
+        # и маска якорей, при которых фигура не выходит за край поля
+        self.orientation_probes = []
+        for entry in SHAPE_CATALOG:
+            weight = 1.0 / (len(SHAPE_CATALOG) * len(entry.orientations))
+            for orientation in entry.orientations:
+                shifts = tuple(r * size + c for r, c in orientation.cells)
+                anchors = sum(1 << (r * size + c)
+                              for r in range(size - orientation.height + 1)
+                              for c in range(size - orientation.width + 1))
+                if anchors:
+                    self.orientation_probes.append((weight, shifts, anchors))
+
+
+def count_holes(bits, geometry):
+    """Пустые клетки, со всех сторон окружённые блоками или краем поля"""
+    size = geometry.size
+    first_col, last_col = geometry.col_masks[0], geometry.col_masks[-1]
+    first_row, last_row = geometry.row_masks[0], geometry.row_masks[-1]
+
+    empty = geometry.full & ~bits
+    left = ((bits << 1) & ~first_col) | first_col
+    right = ((bits >> 1) & ~last_col) | last_col
+    up = (bits << size) | first_row
+    down = (bits >> size) | last_row
+    return popcount(empty & left & right & up & down)
+
+
+def count_open_lines(bits, geometry):
+    """Строки и столбцы, в которых ещё нет ни одного блока"""
+    return (sum(1 for mask in geometry.row_masks if not bits & mask) +
+            sum(1 for mask in geometry.col_masks if not bits & mask))
+
+
+def count_fragmentation(bits, geometry):
+    """Число границ между пустыми и занятыми соседними клетками"""
+    size = geometry.size
+    horizontal = (bits ^ (bits >> 1)) & ~geometry.col_masks[-1] & geometry.full
+    vertical = (bits ^ (bits >> size)) & ~geometry.row_masks[-1] & geometry.full
+    return popcount(horizontal) + popcount(vertical)
+
+
+def placeability(bits, geometry):
+    """Вероятность, что случайная фигура следующей раздачи найдёт место на поле"""
+    empty = geometry.full & ~bits
+    total = 0.0
+    for weight, shifts, anchors in geometry.orientation_probes:
+        # Бит якоря остаётся, только если под каждой клеткой фигуры пусто,
+        # поэтому все якоря проверяются одновременно
+        free = anchors
+        for shift in shifts:
+            free &= empty >> shift
+            if not free:
+                break
+        if free:
+            total += weight
+    return total
+
+
+FEATURES = {
+    'holes': count_holes,
+    'open_lines': count_open_lines,
+    'fragmentation': count_fragmentation,
+    'placeability': placeability
+}
+
+DEFAULT_WEIGHTS = {
+    'holes': -12.0,
+    'open_lines': 4.0,
+    'fragmentation': -1.5,
+    'placeability': 60.0
+}
+
+
+def weighted_heuristic(weights=None):
+    """Эвристика — взвешенная сумма признаков из FEATURES.
+
+    Любая функция вида heuristic(bits, geometry) -> float тоже подходит
+    для SearchPlayer.
+    """
+    weights = dict(DEFAULT_WEIGHTS, **(weights or {}))
+    features = [(FEATURES[name], weight) for name, weight in weights.items() if weight]
+
+    def heuristic(bits, geometry):
+        return sum(weight * feature(bits, geometry) for feature, weight in features)
+    return heuristic
+
+
+class SearchResult(namedtuple('SearchResult', ['moves', 'value', 'nodes', 'elapsed', 'complete'])):
+    """Итог поиска: ходы (piece_index, row, col) в порядке игры через Game.place_piece"""
+    __slots__ = ()
+
+    @property
+    def nodes_per_second(self):
+        return self.nodes / self.elapsed if self.elapsed > 0 else 0.0
+
+
+class _BudgetExhausted(Exception):
+    pass
+
+
+class SearchPlayer:
+    """Перебирает все порядки и позиции фигур набора.
+
+    Перебор ограничивают только max_nodes и time_limit; beam_width оставляет
+    в каждом узле столько лучших по эвристике ходов (см. BEAM_WIDTH).
+    """
+    DEAD_END_PENALTY = 10000
+
+    def __init__(self, heuristic=None, max_nodes=None, time_limit=None,
+                 beam_width=None, table_size=200000):
+        self.heuristic = heuristic or weighted_heuristic()
+        self.max_nodes = max_nodes
+        self.time_limit = time_limit
+        self.beam_width = beam_width
+        self.table_size = table_size
+        self._table = OrderedDict()
+        self.total_nodes = 0
+        self.total_time = 0.0
+
+    @property
+    def nodes_per_second(self):
+        return self.total_nodes / self.total_time if self.total_time > 0 else 0.0
+
+    @property
+    def table_entries(self):
+        return len(self._table)
+
+    def clear_table(self):
+        self._table.clear()
+
+    def choose_move(self, game):
+        result = self.search(game)
+        return result.moves[0] if result.moves else None
+
+    def search(self, game, should_stop=None):
+        return self.search_position(game.size, game.board_bits, game.pieces, should_stop)
+
+    def search_position(self, size, bits, shapes, should_stop=None):
+        """should_stop — функция без аргументов; если вернёт True, поиск
+        прерывается и возвращает лучший найденный к этому моменту ход"""
+        geometry = BoardGeometry.get(size)
+        tables = [PlacementTable.get(size, shape) for shape in shapes]
+
+        start = time.perf_counter()
+        self._deadline = start + self.time_limit if self.time_limit else None
+        self._should_stop = should_stop
+        self._nodes = 0
+        self._root_best = None
+        complete = True
+        try:
+            value, plan = self._search(bits, tuple(tables), geometry, root=True)
+        except _BudgetExhausted:
+            complete = False
+            value, plan = self._root_best
+        elapsed = time.perf_counter() - start
+
+        self.total_nodes += self._nodes
+        self.total_time += elapsed
+        return SearchResult(self._to_game_moves(tables, plan), value, self._nodes, elapsed, complete)
+
+    @staticmethod
+    def _to_game_moves(tables, plan):
+        # Game удаляет поставленную фигуру из списка, поэтому индексы сдвигаются
+        remaining = list(tables)
+        moves = []
+        for table, placement in plan:
+            piece_index = remaining.index(table)
+            remaining.pop(piece_index)
+            moves.append((piece_index, placement.row, placement.col))
+        return moves
+
+    def _count_node(self):
+        self._nodes += 1
+
+    def _check_budget(self):
+        if self.max_nodes is not None and self._nodes >= self.max_nodes:
+            raise _BudgetExhausted()
+        if self._deadline is not None and time.perf_counter() >= self._deadline:
+            raise _BudgetExhausted()
+        if self._should_stop is not None and self._should_stop():
+            raise _BudgetExhausted()
+
+    def _lookup(self, key):
+        entry = self._table.get(key)
+        if entry is not None:
+            self._table.move_to_end(key)
+        return entry
+
+    def _store(self, key, entry):
+        self._table[key] = entry
+        if len(self._table) > self.table_size:
+            self._table.popitem(last=False)
+
+    def _evaluate(self, bits, geometry):
+        key = (bits, ())
+        entry = self._lookup(key)
+        if entry is None:
+            entry = (self.heuristic(bits, geometry), [])
+            self._store(key, entry)
+        return entry[0]
+
+    def _search(self, bits, remaining, geometry, root=False):
+        """Лучшая сумма очков и оценки итоговой позиции для оставшихся фигур"""
+        key = (bits, tuple(sorted(id(table) for table in remaining)))
+        if not root:
+            entry = self._lookup(key)
+            if entry is not None:
+                return entry
+            self._check_budget()
+
+        size = geometry.size
+        children = []
+        for i, table in enumerate(remaining):
+            # Одинаковые фигуры в наборе взаимозаменяемы, перебираем одну
+            if table in remaining[:i]:
+                continue
+            rest = remaining[:i] + remaining[i + 1:]
+            for placement in table.placements:
+                if bits & placement.mask:
+                    continue
+                self._count_node()
+                child_bits, rows, cols = apply_placement(bits, placement, geometry.masks)
+                gain = move_score(table.blocks, len(rows) + len(cols), size)
+                estimate = gain + self._evaluate(child_bits, geometry)
+                children.append((estimate, gain, child_bits, rest, table, placement))
+
+        if not children:
+            entry = (self._evaluate(bits, geometry) - self.DEAD_END_PENALTY * len(remaining), [])
+            self._store(key, entry)
+            return entry
+
+        children.sort(key=lambda child: child[0], reverse=True)
+        if self.beam_width is not None:
+            children = children[:self.beam_width]
+        if root:
+            # Запасной ответ на случай, если бюджет кончится раньше перебора
+            estimate, _, _, _, table, placement = children[0]
+            self._root_best = (estimate, [(table, placement)])
+
+        best = None
+        for estimate, gain, child_bits, rest, table, placement in children:
+            if rest:
+                value, plan = self._search(child_bits, rest, geometry)
+                value += gain
+            else:
+                value, plan = estimate, []
+            if best is None or value > best[0]:
+                best = (value, [(table, placement)] + plan)
+                if root:
+                    self._root_best = best
+
+        self._store(key, best)
+        return best
+
+
+_default_player = None
+_default_player_game = None
+
+
+def search_strategy(game, rng):
+    """Стратегия для simulate.py: один игрок на процесс.
+
+    Таблица транспозиций сбрасывается в начале каждой игры: иначе расход
+    бюджета узлов, а с ним и ходы, зависели бы от того, какие игры процесс
+    сыграл раньше, и повторный запуск с теми же зёрнами мог бы разойтись.
+    """
+    global _default_player, _default_player_game
+    if _default_player is None:
+        _default_player = SearchPlayer(max_nodes=20000, beam_width=BEAM_WIDTH)
+    if _default_player_game is not game:
+        _default_player.clear_table()
+        _default_player_game = game
+    return _default_player.choose_move(game)
@@ -0,0 +1,180 @@
+"""Пакетный движок на NumPy: тысячи полей ходят одновременно.
+
+Все поля хранятся одним массивом (N, size, size) из uint8. Проверка
+позиций, размещение фигур и очистка линий выполняются векторными операциями
+сразу по всем полям, без цикла Python по клеткам. Каждое поле раздаёт фигуры
+своим engine.Dealer, поэтому при тех же зёрнах результаты совпадают с Game
+и simulate.py.
+
+Требует numpy; основной движок engine.py от него не зависит.
+"""
+import random
+
+import numpy as np
+
+from engine import Game, Dealer, ORIENTATIONS, PIECES_PER_SET, move_score
+
+
+class BatchGame:
+    def __init__(self, seeds, size=None, uniform_color=None, block_color=None):
+        settings = Game.get_default_settings()
+        self.size = size if size is not None else settings['size']
+        self._uniform_color = uniform_color if uniform_color is not None else settings['uniform_color']
+        self._block_color = block_color or settings['block_color']
+
+        self.seeds = list(seeds)
+        count = len(self.seeds)
+        self.boards = np.zeros((count, self.size, self.size), dtype=np.uint8)
+        self.scores = np.zeros(count, dtype=np.int64)
+        self.moves = np.zeros(count, dtype=np.int64)
+        self.lines_cleared = np.zeros(count, dtype=np.int64)
+        self.done = np.zeros(count, dtype=bool)
+
+        self._dealers = [Dealer(self._uniform_color, self._block_color, seed=seed)
+                         for seed in self.seeds]
+        self.pieces = [[] for _ in range(count)]
+        self.piece_colors = [[] for _ in range(count)]
+        for index in range(count):
+            self._deal(index)
+        self._update_done(np.arange(count))
+
+    def __len__(self):
+        return len(self.seeds)
+
+    def _deal(self, index):
+        self.pieces[index], self.piece_colors[index] = self._dealers[index].deal()
+
+    def _slot_ids(self, slot):
+        # Номер ориентации фигуры в слоте для каждого поля, -1 — слот пуст
+        return np.array([pieces[slot].id if slot < len(pieces) else -1
+                         for pieces in self.pieces], dtype=np.int64)
+
+    def _fits(self, boards, orientation):
+        """Для набора полей возвращает (M, size, size): куда помещается ориентация"""
+        size = self.size
+        result = np.zeros((len(boards), size, size), dtype=bool)
+        height = size - orientation.height + 1
+        width = size - orientation.width + 1
+        if height <= 0 or width <= 0:
+            return result
+
+        # Окно каждой клетки фигуры сдвигается по полю; позиция занята,
+        # если хотя бы одно окно попало на блок
+        occupied = np.zeros((len(boards), height, width), dtype=np.uint8)
+        for r, c in orientation.cells:
+            occupied |= boards[:, r:r + height, c:c + width]
+        result[:, :height, :width] = occupied == 0
+        return result
+
+    def legal_anchors(self, slot, indexes=None):
+        """Маска (M, size, size) допустимых якорей фигуры из слота slot"""
+        if indexes is None:
+            indexes = np.arange(len(self))
+        ids = self._slot_ids(slot)[indexes]
+        result = np.zeros((len(indexes), self.size, self.size), dtype=bool)
+        active = (ids >= 0) & ~self.done[indexes]
+        for orientation_id in np.unique(ids[active]):
+            group = np.nonzero(active & (ids == orientation_id))[0]
+            result[group] = self._fits(self.boards[indexes[group]], ORIENTATIONS[orientation_id])
+        return result
+
+    def _update_done(self, indexes):
+        has_moves = np.zeros(len(indexes), dtype=bool)
+        for slot in range(PIECES_PER_SET):
+            has_moves |= self.legal_anchors(slot, indexes).reshape(len(indexes), -1).any(axis=1)
+        self.done[indexes] = ~has_moves
+
+    def step(self, slots, rows, cols):
+        """Делает по одному ходу на каждом незавершённом поле.
+
+        slots, rows, cols — массивы длины N. Недопустимые ходы и ходы
+        со слотом -1 пропускаются. Возвращает маску полей, где ход сделан.
+        """
+        slots = np.asarray(slots, dtype=np.int64)
+        rows = np.asarray(rows, dtype=np.int64)
+        cols = np.asarray(cols, dtype=np.int64)
+        count = len(self)
+        size = self.size
+
+        placed = np.zeros(count, dtype=bool)
+        blocks = np.zeros(count, dtype=np.int64)
+        for slot in range(PIECES_PER_SET):
+            ids = self._slot_ids(slot)
+            active = (slots == slot) & (ids >= 0) & ~self.done
+            for orientation_id in np.unique(ids[active]):
+                orientation = ORIENTATIONS[orientation_id]
+                group = np.nonzero(active & (ids == orientation_id))[0]
+                group_rows = rows[group]
+                group_cols = cols[group]
+                inside = ((group_rows >= 0) & (group_cols >= 0) &
+                          (group_rows + orientation.height <= size) &
+                          (group_cols + orientation.width <= size))
+                group, group_rows, group_cols = group[inside], group_rows[inside], group_cols[inside]
+
+                cell_rows = group_rows[:, None] + np.array([r for r, _ in orientation.cells])
+                cell_cols = group_cols[:, None] + np.array([c for _, c in orientation.cells])
+                free = ~self.boards[group[:, None], cell_rows, cell_cols].any(axis=1)
+                group, cell_rows, cell_cols = group[free], cell_rows[free], cell_cols[free]
+
+                self.boards[group[:, None], cell_rows, cell_cols] = 1
+                placed[group] = True
+                blocks[group] = orientation.blocks
+
+        # Полные строки и столбцы очищаются одной маской на все поля
+        full_rows = self.boards.all(axis=2)
+        full_cols = self.boards.all(axis=1)
+        lines = full_rows.sum(axis=1) + full_cols.sum(axis=1)
+        self.boards[full_rows[:, :, None] | full_cols[:, None, :]] = 0
+
+        self.scores += move_score(blocks, lines, size)
+        self.moves += placed
+        self.lines_cleared += lines
+
+        indexes = np.nonzero(placed)[0]
+        for index in indexes:
+            self.pieces[index].pop(slots[index])
+            self.piece_colors[index].pop(slots[index])
+            if not self.pieces[index]:
+                self._deal(index)
+        self._update_done(indexes)
+        return placed
+
+    def first_moves(self):
+        """Векторный аналог simulate.first_move_strategy"""
+        count = len(self)
+        slots = np.full(count, -1, dtype=np.int64)
+        anchors = np.zeros(count, dtype=np.int64)
+        for slot in range(PIECES_PER_SET):
+            legal = self.legal_anchors(slot).reshape(count, -1)
+            chosen = legal.any(axis=1) & (slots < 0)
+            slots[chosen] = slot
+            anchors[chosen] = legal.argmax(axis=1)[chosen]
+        return slots, anchors // self.size, anchors % self.size
+
+    def random_moves(self, rngs):
+        """Аналог simulate.random_strategy: по одному генератору стратегии на поле"""
+        count = len(self)
+        legal = np.stack([self.legal_anchors(slot).reshape(count, -1)
+                          for slot in range(PIECES_PER_SET)], axis=1).reshape(count, -1)
+        totals = legal.sum(axis=1)
+        slots = np.full(count, -1, dtype=np.int64)
+        anchors = np.zeros(count, dtype=np.int64)
+        for index in np.nonzero(totals)[0]:
+            # randrange(k) тратит генератор так же, как rng.choice по списку из k ходов
+            choice = np.flatnonzero(legal[index])[rngs[index].randrange(totals[index])]
+            slots[index], anchors[index] = divmod(choice, self.size * self.size)
+        return slots, anchors // self.size, anchors % self.size
+
+    def run(self, strategy='first'):
+        """Доигрывает все поля до конца заданной стратегией"""
+        if strategy == 'first':
+            choose = self.first_moves
+        elif strategy == 'random':
+            rngs = [random.Random(seed) for seed in self.seeds]
+            choose = lambda: self.random_moves(rngs)
+        else:
+            raise ValueError(f"Неизвестная стратегия: {strategy}")
+
+        while not self.done.all():
+            self.step(*choose())
+        return self
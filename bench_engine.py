@@ -0,0 +1,285 @@
+"""Замеры скорости движка «Блок Бласт!» на фиксированных зёрнах и позициях.
+
+Для каждого движка поля, размера и заготовленной позиции (пустое поле,
+почти заполненное, шахматная доска) меряется время одного вызова
+can_place_piece, place_piece, _check_lines, _has_available_moves
+и _generate_pieces_set; отдельно — скорость целых игр с пустого поля.
+Результат — JSON; с --baseline он сравнивается с сохранённым прогоном,
+и при замедлении больше порога скрипт завершается с кодом 1.
+
+Пример:
+    python bench_engine.py --output baseline.json
+    python bench_engine.py --baseline baseline.json --threshold 0.1
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+
+from engine import Game, GameState
+from simulate import first_move_strategy
+
+SIZES = (5, 10, 15, 32, 64)
+POSITIONS = ('empty', 'nearly_full', 'checkerboard')
+
+
+def empty_position(size):
+    return 0
+
+
+def nearly_full_position(size):
+    # Свободны только главная диагональ и клетки справа от неё: в каждой строке
+    # и столбце по две пустые клетки, поэтому ни одна линия не заполнена,
+    # а домино на диагонали сразу очищает строку или столбец
+    return sum(1 << (r * size + c) for r in range(size) for c in range(size)
+               if (c - r) % size not in (0, 1))
+
+
+def checkerboard_position(size):
+    return sum(1 << (r * size + c) for r in range(size) for c in range(size)
+               if (r + c) % 2 == 0)
+
+
+POSITION_BUILDERS = {
+    'empty': empty_position,
+    'nearly_full': nearly_full_position,
+    'checkerboard': checkerboard_position
+}
+
+
+def make_game(engine, size, position, seed):
+    game = Game(size=size, engine=engine, seed=seed)
+    game.load_position(POSITION_BUILDERS[position](size))
+    return game
+
+
+def find_playable_seed(engine, size, position, seed, attempts=1000):
+    """Первое зерно не меньше seed, при котором в позиции есть ход"""
+    for candidate in range(seed, seed + attempts):
+        if first_move_strategy(make_game(engine, size, position, candidate), None) is not None:
+            return candidate
+    return None
+
+
+def measure(sample, min_time, rounds):
+    """Вызывает sample() -> (операций, секунд), пока не наберётся min_time.
+
+    Из rounds повторов берётся лучший: шум только замедляет.
+    Подготовка внутри sample() в замер не входит, но ограничена по времени.
+    """
+    best = None
+    for _ in range(rounds):
+        ops = 0
+        elapsed = 0.0
+        deadline = time.perf_counter() + max(1.0, min_time * 20)
+        while elapsed < min_time and time.perf_counter() < deadline:
+            count, seconds = sample()
+            ops += count
+            elapsed += seconds
+        if ops and (best is None or elapsed / ops < best[1] / best[0]):
+            best = (ops, elapsed)
+    if best is None:
+        return None
+    ops, elapsed = best
+    return {'ops': ops, 'seconds': elapsed, 'ns_per_op': elapsed / ops * 1e9,
+            'ops_per_sec': ops / elapsed if elapsed else 0.0}
+
+
+def bench_can_place(game, batch=20):
+    # Все якоря поля, включая ведущие за край, для каждой фигуры набора
+    size = game.size
+    calls = [(i, r, c) for i in range(len(game.pieces))
+             for r in range(size) for c in range(size)]
+    can_place = game.can_place_piece
+
+    def sample():
+        start = time.perf_counter()
+        for _ in range(batch):
+            for call in calls:
+                can_place(*call)
+        return batch * len(calls), time.perf_counter() - start
+    return sample
+
+
+def bench_has_available_moves(game, batch=10000):
+    has_moves = game._has_available_moves
+
+    def sample():
+        start = time.perf_counter()
+        for _ in range(batch):
+            has_moves()
+        return batch, time.perf_counter() - start
+    return sample
+
+
+def bench_generate_pieces_set(game, batch=10):
+    # Поле не меняется, раздаются новые наборы из генератора игры
+    generate = game._generate_pieces_set
+
+    def sample():
+        start = time.perf_counter()
+        for _ in range(batch):
+            generate()
+        return batch, time.perf_counter() - start
+    return sample
+
+
+def bench_place_piece(engine, size, position, seed):
+    """Замеры place_piece и вызванного внутри _check_lines на свежих играх"""
+    check_lines_time = [0.0]
+
+    def prepare():
+        game = make_game(engine, size, position, seed)
+        check_lines = game._check_lines
+
+        def timed_check_lines(placement):
+            start = time.perf_counter()
+            try:
+                return check_lines(placement)
+            finally:
+                check_lines_time[0] += time.perf_counter() - start
+        game._check_lines = timed_check_lines
+        return game, first_move_strategy(game, None)
+
+    def place_sample():
+        game, move = prepare()
+        start = time.perf_counter()
+        game.place_piece(*move)
+        return 1, time.perf_counter() - start
+
+    def check_lines_sample():
+        game, move = prepare()
+        check_lines_time[0] = 0.0
+        game.place_piece(*move)
+        return 1, check_lines_time[0]
+    return place_sample, check_lines_sample
+
+
+def bench_full_game(engine, size, seed):
+    """Целые игры стратегией «первый допустимый ход»; операция — один ход"""
+    seeds = iter(range(seed, seed + 10 ** 9))
+
+    def sample():
+        game = Game(size=size, engine=engine, seed=next(seeds))
+        start = time.perf_counter()
+        while game.state == GameState.PLAYING:
+            move = first_move_strategy(game, None)
+            if move is None or not game.place_piece(*move):
+                break
+        return game.moves, time.perf_counter() - start
+    return sample
+
+
+def run_benchmarks(engines, sizes, positions, seed=0, min_time=0.2, rounds=3, log=None):
+    """Возвращает {'движок/размер/позиция/метод': замер}"""
+    results = {}
+
+    def record(key, sample):
+        results[key] = measure(sample, min_time, rounds)
+        if log is not None and results[key] is not None:
+            print(f"{key:55s} {results[key]['ns_per_op']:12.0f} нс", file=log)
+
+    for engine in engines:
+        for size in sizes:
+            for position in positions:
+                prefix = f"{engine}/{size}/{position}"
+                game_seed = find_playable_seed(engine, size, position, seed)
+                if game_seed is None:
+                    results[f"{prefix}/place_piece"] = None
+                    continue
+                game = make_game(engine, size, position, game_seed)
+                record(f"{prefix}/can_place_piece", bench_can_place(game))
+                record(f"{prefix}/_has_available_moves", bench_has_available_moves(game))
+                record(f"{prefix}/_generate_pieces_set", bench_generate_pieces_set(game))
+                place_sample, check_lines_sample = bench_place_piece(engine, size, position, game_seed)
+                record(f"{prefix}/place_piece", place_sample)
+                record(f"{prefix}/_check_lines", check_lines_sample)
+            record(f"{engine}/{size}/game/move", bench_full_game(engine, size, seed))
+    return results
+
+
+def compare(results, baseline, threshold, metrics=('ns_per_op',)):
+    """Сравнивает замеры с базовым прогоном; у всех метрик меньше — лучше.
+
+    Возвращает {ключ: {'baseline', 'value', 'ratio', 'verdict'}}, где verdict —
+    'regression', 'speedup' или 'same'. Если метрик несколько, ключ — 'ключ/метрика'.
+    """
+    comparison = {}
+    for key, current in results.items():
+        previous = baseline.get(key)
+        if not current or not previous:
+            continue
+        for metric in metrics:
+            if not previous.get(metric) or metric not in current:
+                continue
+            ratio = current[metric] / previous[metric]
+            if ratio > 1 + threshold:
+                verdict = 'regression'
+            elif ratio < 1 - threshold:
+                verdict = 'speedup'
+            else:
+                verdict = 'same'
+            name = key if len(metrics) == 1 else f"{key}/{metric}"
+            comparison[name] = {'baseline': previous[metric], 'value': current[metric],
+                                'ratio': ratio, 'verdict': verdict}
+    return comparison
+
+
+def report_comparison(comparison, log=sys.stderr):
+    """Печатает отличия от базового прогона и возвращает ключи замедлений"""
+    regressions = []
+    for key, row in sorted(comparison.items()):
+        if row['verdict'] != 'same':
+            print(f"{row['verdict']:10s} {key:55s} x{row['ratio']:.2f}", file=log)
+        if row['verdict'] == 'regression':
+            regressions.append(key)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Замеры скорости движка «Блок Бласт!»")
+    parser.add_argument('--engines', nargs='+', default=sorted(Game.ENGINES),
+                        choices=sorted(Game.ENGINES))
+    parser.add_argument('--sizes', nargs='+', type=int, default=list(SIZES))
+    parser.add_argument('--positions', nargs='+', default=list(POSITIONS), choices=POSITIONS)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--min-time', type=float, default=0.2,
+                        help="секунд замера на один метод в каждом повторе")
+    parser.add_argument('--rounds', type=int, default=3, help="повторов, берётся лучший")
+    parser.add_argument('--output', help="куда записать JSON (по умолчанию stdout)")
+    parser.add_argument('--baseline', help="JSON прошлого прогона для сравнения")
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help="допустимое отклонение от базового прогона, доля")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.engines, args.sizes, args.positions, args.seed,
+                             args.min_time, args.rounds, log=sys.stderr)
+    report = {
+        'meta': {'python': platform.python_version(), 'implementation': platform.python_implementation(),
+                 'machine': platform.machine(), 'seed': args.seed, 'min_time': args.min_time,
+                 'rounds': args.rounds, 'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S')},
+        'results': results
+    }
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+        report['comparison'] = compare(results, baseline, args.threshold)
+        regressions = report_comparison(report['comparison'])
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if regressions:
+        print(f"Замедлений: {len(regressions)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
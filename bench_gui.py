@@ -0,0 +1,205 @@
+"""Замеры интерфейса «Блок Бласт!» без человека и без экрана.
+
+MainWindow запускается на платформе Qt offscreen и проигрывает сценарий
+ходов: выбор фигуры (select_piece), затем клик по полю (board_click) или
+перетаскивание с отпусканием (drag_piece, handle_piece_drop). Для каждого
+вида поля и размера записываются время update_game_state и применения
+изменений интерфейса, время кадров (отрисовка всех виджетов окна), число
+виджетов и пиковая память процесса. Каждая конфигурация идёт в отдельном
+процессе, иначе пиковая память одной смешалась бы с другой.
+
+Пример:
+    python bench_gui.py --sizes 5 10 15 --output gui.json
+    python bench_gui.py --baseline gui.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+
+from bench_engine import compare, report_comparison
+from engine import GameState
+from instrumentation import percentile
+
+SIZES = (5, 10, 15)
+ACTIONS = ('click', 'drop')
+# Метрики, по которым прогон сравнивается с базовым; у всех меньше — лучше
+COMPARED_METRICS = ('update_game_state_ms', 'apply_ui_changes_ms', 'frame_p50_ms',
+                    'frame_p99_ms', 'widgets', 'peak_rss_kb')
+
+
+def timing_summary(durations):
+    values = list(durations)
+    return {'count': len(values),
+            'mean_ms': sum(values) / len(values) * 1000 if values else 0.0,
+            'p50_ms': percentile(values, 0.5) * 1000,
+            'p99_ms': percentile(values, 0.99) * 1000}
+
+
+def run_session(view, size, moves, seed, settle):
+    """Играет сценарий в текущем процессе и возвращает словарь замеров"""
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt5.QtCore import QEventLoop, QTimer
+    from PyQt5.QtWidgets import QApplication, QMessageBox, QWidget
+
+    from game import MainWindow
+    from instrumentation import FrameTimer, Profiler
+
+    app = QApplication.instance() or QApplication([sys.argv[0]])
+    app.setStyle("Fusion")
+
+    def pump(seconds):
+        loop = QEventLoop()
+        QTimer.singleShot(int(seconds * 1000), loop.quit)
+        loop.exec_()
+
+    window = MainWindow()
+    window.apply_theme("dark")
+    window.settings.update(size=size, board_view=view, seed=seed)
+    window.new_game()
+    window.show()
+    pump(settle)
+
+    # Запуск окна в замеры не входит, только ходы сценария
+    profiler = Profiler(window=10 ** 6)
+    profiler.wrap(window, 'update_game_state', 'MainWindow.update_game_state')
+    profiler.wrap(window.ui_scheduler, '_apply', 'MainWindow._apply_ui_changes')
+    FrameTimer(profiler, window)
+
+    rng = random.Random(seed)
+    games = 1
+    clicks = 0
+    widgets = 0
+    start = time.perf_counter()
+    for step in range(moves):
+        game = window.game
+        if game.state != GameState.PLAYING:
+            # Окно с итогом закрываем, чтобы оно не копилось в числе виджетов
+            for box in window.findChildren(QMessageBox):
+                box.close()
+                box.deleteLater()
+            window.settings['seed'] = seed + games
+            games += 1
+            window.new_game()
+            pump(settle)
+            game = window.game
+
+        moves_before = game.moves
+        piece_index, row, col = rng.choice([(i, r, c) for i in range(len(game.pieces))
+                                            for r, c in game.legal_moves(i)])
+        window.select_piece(piece_index)
+        board = window.board_view
+        center = board.cell_rect(row, col).center()
+        if ACTIONS[step % len(ACTIONS)] == 'drop' and board.cell_at(center) == (row, col):
+            global_pos = board.mapToGlobal(center)
+            window.drag_piece(window._piece_widget(piece_index), global_pos)
+            window.drop_piece(global_pos)
+        else:
+            # Клетки больших полей не помещаются в окно фиксированного размера,
+            # и бросить фигуру на скрытую клетку нельзя — тогда ставим кликом
+            window.board_click(row, col)
+            clicks += 1
+        if game.moves == moves_before:
+            raise RuntimeError(f"Ход {step} ({piece_index}, {row}, {col}) не сделан")
+
+        pump(settle)
+        widgets = max(widgets, len(window.findChildren(QWidget)))
+    elapsed = time.perf_counter() - start
+
+    update = timing_summary(profiler.durations['MainWindow.update_game_state'])
+    apply = timing_summary(profiler.durations['MainWindow._apply_ui_changes'])
+    frames = timing_summary(profiler.durations['frame'])
+    return {
+        'moves': moves, 'clicks': clicks, 'games': games, 'seconds': elapsed,
+        'update_game_state_ms': update['mean_ms'], 'update_game_state_p99_ms': update['p99_ms'],
+        'apply_ui_changes_ms': apply['mean_ms'], 'apply_ui_changes_p99_ms': apply['p99_ms'],
+        'frames': frames['count'], 'frame_mean_ms': frames['mean_ms'],
+        'frame_p50_ms': frames['p50_ms'], 'frame_p99_ms': frames['p99_ms'],
+        'widgets': widgets, 'app_widgets': len(QApplication.allWidgets()),
+        # На Linux ru_maxrss в килобайтах
+        'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    }
+
+
+def run_isolated(view, size, moves, seed, settle):
+    """run_session в отдельном процессе: своя пиковая память и своё QApplication"""
+    env = dict(os.environ, QT_QPA_PLATFORM='offscreen')
+    command = [sys.executable, os.path.abspath(__file__), '--session', view, str(size),
+               '--moves', str(moves), '--seed', str(seed), '--settle', str(settle)]
+    # Предупреждения Qt из процесса показываем, только если он упал
+    completed = subprocess.run(command, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                               cwd=os.path.dirname(os.path.abspath(__file__)))
+    if completed.returncode != 0:
+        sys.stderr.write(completed.stderr.decode('utf-8', 'replace'))
+        raise RuntimeError(f"Замер {view}/{size} завершился с кодом {completed.returncode}")
+    return json.loads(completed.stdout.decode('utf-8').splitlines()[-1])
+
+
+def main(argv=None):
+    from game import MainWindow
+
+    parser = argparse.ArgumentParser(description="Замеры интерфейса «Блок Бласт!» без экрана")
+    parser.add_argument('--views', nargs='+', default=sorted(MainWindow.BOARD_VIEWS),
+                        choices=sorted(MainWindow.BOARD_VIEWS))
+    parser.add_argument('--sizes', nargs='+', type=int, default=list(SIZES))
+    parser.add_argument('--moves', type=int, default=60, help="ходов сценария на конфигурацию")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--settle', type=float, default=0.02,
+                        help="секунд работы цикла событий после каждого хода")
+    parser.add_argument('--output', help="куда записать JSON (по умолчанию stdout)")
+    parser.add_argument('--baseline', help="JSON прошлого прогона для сравнения")
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help="допустимое отклонение от базового прогона, доля")
+    parser.add_argument('--session', nargs=2, metavar=('VIEW', 'SIZE'), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.session:
+        view, size = args.session
+        print(json.dumps(run_session(view, int(size), args.moves, args.seed, args.settle)))
+        return 0
+
+    results = {}
+    for view in args.views:
+        for size in args.sizes:
+            key = f"{view}/{size}"
+            results[key] = run_isolated(view, size, args.moves, args.seed, args.settle)
+            row = results[key]
+            print(f"{key:12s} update {row['update_game_state_ms']:.3f} мс  "
+                  f"применение {row['apply_ui_changes_ms']:.2f} мс  "
+                  f"кадр p50 {row['frame_p50_ms']:.2f} p99 {row['frame_p99_ms']:.2f} мс  "
+                  f"виджетов {row['widgets']}  RSS {row['peak_rss_kb'] / 1024:.0f} МБ",
+                  file=sys.stderr)
+
+    report = {
+        'meta': {'python': platform.python_version(), 'machine': platform.machine(),
+                 'moves': args.moves, 'seed': args.seed, 'settle': args.settle,
+                 'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S')},
+        'results': results
+    }
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+        report['comparison'] = compare(results, baseline, args.threshold, COMPARED_METRICS)
+        regressions = report_comparison(report['comparison'])
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if regressions:
+        print(f"Замедлений: {len(regressions)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
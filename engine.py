@@ -0,0 +1,804 @@
+"""Правила игры «Блок Бласт!» без зависимости от PyQt5.
+
+Модуль содержит только стандартную библиотеку, поэтому его можно
+импортировать в фоновых процессах и на машинах без графического окружения.
+"""
+import random
+import time
+from collections import Counter, defaultdict, deque, namedtuple
+from enum import Enum
+
+
+class GameState(Enum):
+    PLAYING = 1
+    GAME_OVER = 2
+
+    @staticmethod
+    def get_state_name(state):
+        return "Игра" if state == GameState.PLAYING else "Конец игры"
+
+
+# Ориентация фигуры: номер в общем каталоге, форма, смещения блоков,
+# габариты и число блоков
+Orientation = namedtuple('Orientation', ['id', 'shape', 'cells', 'height', 'width', 'blocks'])
+# Фигура каталога: исходная форма и все её различные повороты
+ShapeEntry = namedtuple('ShapeEntry', ['base', 'orientations', 'blocks'])
+
+BASE_SHAPES = (
+    ((1,),), ((1, 1),), ((1, 1, 1),), ((1, 1), (1, 1)),
+    ((1, 1, 1, 1),), ((1, 1, 1), (1, 0, 0)), ((1, 1, 0), (0, 1, 1)),
+    ((1, 1, 1), (0, 1, 0)), ((1, 1, 1, 1, 1),), ((1,), (1,), (1,), (1,), (1,)),
+    ((1, 0), (1, 1), (0, 1)), ((1, 1, 1), (0, 1, 0), (0, 1, 0)),
+    ((1, 1, 1, 1), (0, 0, 0, 1)), ((1, 1, 1), (1, 0, 1)),
+    ((1, 1), (1, 0), (1, 1)), ((1, 0, 1), (1, 1, 1)),
+    ((1, 1, 1, 1, 1, 1),), ((1,), (1,), (1,), (1,), (1,), (1,)),
+    ((1, 1, 1), (1, 1, 1)), ((1, 1), (1, 1), (1, 1))
+)
+
+
+def _build_shape_catalog(shapes):
+    """Собирает неизменяемый каталог фигур без повторяющихся поворотов"""
+    catalog = []
+    orientations = []
+    for base in shapes:
+        entry_orientations = []
+        shape = base
+        for _ in range(4):
+            if all(o.shape != shape for o in entry_orientations):
+                cells = tuple((r, c) for r, line in enumerate(shape)
+                              for c, filled in enumerate(line) if filled)
+                orientation = Orientation(len(orientations), shape, cells,
+                                          len(shape), len(shape[0]), len(cells))
+                orientations.append(orientation)
+                entry_orientations.append(orientation)
+            shape = tuple(zip(*shape[::-1]))
+        catalog.append(ShapeEntry(base, tuple(entry_orientations), entry_orientations[0].blocks))
+    return tuple(catalog), tuple(orientations)
+
+
+# Каталог строится один раз при импорте; раздача только выбирает ссылки из него
+SHAPE_CATALOG, ORIENTATIONS = _build_shape_catalog(BASE_SHAPES)
+
+PIECES_PER_SET = 3
+
+
+def random_color(rng):
+    return (
+        rng.randint(50, 255),
+        rng.randint(50, 255),
+        rng.randint(50, 255)
+    )
+
+
+def deal_pieces(rng, uniform_color, block_color):
+    """Раздаёт набор фигур: ориентации из каталога и их цвета.
+
+    Порядок обращений к rng фиксирован, поэтому любой движок, раздающий через
+    эту функцию с тем же зерном, получает те же фигуры, что и Game.
+    """
+    orientations = []
+    colors = []
+    for _ in range(PIECES_PER_SET):
+        # Случайная фигура и один из её различных поворотов
+        orientations.append(rng.choice(rng.choice(SHAPE_CATALOG).orientations))
+        colors.append(block_color if uniform_color else random_color(rng))
+    return orientations, colors
+
+
+class Dealer:
+    """Раздаёт наборы фигур из собственного генератора случайных чисел.
+
+    У каждой игры свой генератор, поэтому игры в одном процессе не влияют
+    друг на друга, а раздача полностью определяется зерном. Наборы можно
+    подготовить заранее через prefetch(); порядок раздачи от этого не меняется.
+    """
+
+    def __init__(self, uniform_color, block_color, seed=None, rng=None):
+        self._uniform_color = uniform_color
+        self._block_color = block_color
+        self._rng = rng if rng is not None else random.Random(seed)
+        self._queue = deque()
+
+    @property
+    def rng(self):
+        return self._rng
+
+    @property
+    def prefetched(self):
+        return len(self._queue)
+
+    def prefetch(self, count):
+        for _ in range(count):
+            orientations, colors = deal_pieces(self._rng, self._uniform_color, self._block_color)
+            self._queue.append((tuple(orientations), tuple(colors)))
+
+    def deal(self):
+        if self._queue:
+            orientations, colors = self._queue.popleft()
+            return list(orientations), list(colors)
+        return deal_pieces(self._rng, self._uniform_color, self._block_color)
+
+    def get_state(self):
+        # Заранее подготовленные наборы — часть состояния: генератор уже ушёл вперёд
+        return self._rng.getstate(), tuple(self._queue)
+
+    def set_state(self, state):
+        rng_state, queue = state
+        self._rng.setstate(rng_state)
+        self._queue = deque(queue)
+
+
+# Одна допустимая позиция фигуры: номер в таблице, якорь, маска занимаемых
+# битов, список клеток и затронутые строки и столбцы
+Placement = namedtuple('Placement', ['index', 'row', 'col', 'mask', 'cells', 'rows', 'cols'])
+
+
+class PlacementTable:
+    """Все позиции фигуры, которые помещаются в поле заданного размера.
+
+    Таблицы строятся лениво и кэшируются на уровне класса по ключу
+    (размер поля, форма), поэтому общие для всех экземпляров Game
+    и переживают new_game().
+    """
+    _cache = {}
+
+    @classmethod
+    def get(cls, size, shape):
+        key = (size, shape if isinstance(shape, tuple) else tuple(map(tuple, shape)))
+        table = cls._cache.get(key)
+        if table is None:
+            table = cls._cache[key] = cls(size, key[1])
+        return table
+
+    def __init__(self, size, shape):
+        offsets = [(r, c) for r, line in enumerate(shape)
+                   for c, filled in enumerate(line) if filled]
+        height = len(shape)
+        width = len(shape[0]) if height > 0 else 0
+        origin_mask = sum(1 << (r * size + c) for r, c in offsets)
+
+        self.size = size
+        self.shape = shape
+        self.blocks = len(offsets)
+        anchors = [(row, col) for row in range(size - height + 1)
+                   for col in range(size - width + 1)]
+        rows = sorted({r for r, _ in offsets})
+        cols = sorted({c for _, c in offsets})
+        self.placements = tuple(
+            Placement(index, row, col, origin_mask << (row * size + col),
+                      tuple((row + r, col + c) for r, c in offsets),
+                      tuple(row + r for r in rows), tuple(col + c for c in cols))
+            for index, (row, col) in enumerate(anchors)
+        )
+        self._by_anchor = {(p.row, p.col): p for p in self.placements}
+
+        # Обратные индексы: какие позиции задевают клетку, строку или столбец
+        by_cell = {}
+        by_row = [set() for _ in range(size)]
+        by_col = [set() for _ in range(size)]
+        for p in self.placements:
+            for r, c in p.cells:
+                by_cell.setdefault((r, c), []).append(p.index)
+                by_row[r].add(p.index)
+                by_col[c].add(p.index)
+        self._by_cell = {cell: tuple(indexes) for cell, indexes in by_cell.items()}
+        self._by_row = [tuple(sorted(indexes)) for indexes in by_row]
+        self._by_col = [tuple(sorted(indexes)) for indexes in by_col]
+
+    def at(self, row, col):
+        return self._by_anchor.get((row, col))
+
+    def covering_cell(self, cell):
+        return self._by_cell.get(cell, ())
+
+    def covering_row(self, row):
+        return self._by_row[row]
+
+    def covering_col(self, col):
+        return self._by_col[col]
+
+
+class LineMasks:
+    """Маски строк и столбцов поля-числа; кэшируются по размеру поля"""
+    _cache = {}
+
+    @classmethod
+    def get(cls, size):
+        masks = cls._cache.get(size)
+        if masks is None:
+            masks = cls._cache[size] = cls(size)
+        return masks
+
+    def __init__(self, size):
+        self.size = size
+        self.full = (1 << (size * size)) - 1
+        self.rows = tuple(((1 << size) - 1) << (r * size) for r in range(size))
+        column = sum(1 << (r * size) for r in range(size))
+        self.cols = tuple(column << c for c in range(size))
+
+
+def apply_placement(bits, placement, masks):
+    """Ставит фигуру на поле-число и очищает заполненные линии.
+
+    Возвращает (новое поле, очищенные строки, очищенные столбцы). Правила
+    те же, что в Game.place_piece, для тех, кто хранит поле одной маской.
+    """
+    bits |= placement.mask
+    row_masks, col_masks = masks.rows, masks.cols
+    # Заполниться могли только строки и столбцы, которые задела фигура
+    rows = [r for r in placement.rows if bits & row_masks[r] == row_masks[r]]
+    cols = [c for c in placement.cols if bits & col_masks[c] == col_masks[c]]
+    if rows or cols:
+        clear = 0
+        for r in rows:
+            clear |= row_masks[r]
+        for c in cols:
+            clear |= col_masks[c]
+        bits &= ~clear
+    return bits, rows, cols
+
+
+class ListBoard:
+    """Поле в виде списка списков: каждая клетка проверяется отдельно."""
+
+    def __init__(self, size):
+        self._size = size
+        self._cells = [[0 for _ in range(size)] for _ in range(size)]
+
+    def to_list(self):
+        return self._cells
+
+    def to_bits(self):
+        size = self._size
+        return sum(1 << (r * size + c)
+                   for r, line in enumerate(self._cells)
+                   for c, filled in enumerate(line) if filled)
+
+    def fits(self, placement):
+        cells = self._cells
+        return not any(cells[r][c] for r, c in placement.cells)
+
+    def place(self, placement):
+        for r, c in placement.cells:
+            self._cells[r][c] = 1
+
+    def clear_lines(self, rows, cols):
+        for r in rows:
+            self._cells[r] = [0] * self._size
+        for c in cols:
+            for row in range(self._size):
+                self._cells[row][c] = 0
+
+
+class BitBoard:
+    """Поле, упакованное в одно целое число: клетка (r, c) — бит r * size + c.
+
+    Каждая позиция фигуры хранится в PlacementTable как уже сдвинутая маска,
+    поэтому проверка размещения — одно AND, а очистка линий — несколько
+    операций с масками строк и столбцов.
+    """
+
+    def __init__(self, size):
+        self._size = size
+        self._bits = 0
+        self._masks = LineMasks.get(size)
+        self._cells = None
+
+    def to_bits(self):
+        return self._bits
+
+    def to_list(self):
+        # Список списков нужен только интерфейсу, поэтому строим его лениво
+        if self._cells is None:
+            size = self._size
+            bits = self._bits
+            self._cells = [[(bits >> (r * size + c)) & 1 for c in range(size)]
+                           for r in range(size)]
+        return self._cells
+
+    def fits(self, placement):
+        return not self._bits & placement.mask
+
+    def place(self, placement):
+        self._bits |= placement.mask
+        self._cells = None
+
+    def clear_lines(self, rows, cols):
+        mask = 0
+        for r in rows:
+            mask |= self._masks.rows[r]
+        for c in cols:
+            mask |= self._masks.cols[c]
+        if mask:
+            self._bits &= ~mask
+            self._cells = None
+
+
+class EngineStats:
+    """Счётчики работы движка для поиска регрессий и тяжёлых позиций.
+
+    Подключается к игре через Game.enable_stats; один объект можно отдать
+    нескольким играм, тогда счётчики суммируются. Подписчики add_callback
+    получают события 'deal', 'move' и 'game_over' как callback(event, details).
+    """
+    COUNTERS = ('can_place_calls', 'can_place_rejected_early', 'can_place_rejected',
+                'placements_checked', 'available_checks', 'deals', 'moves',
+                'lines_cleared', 'games_over')
+    TIMED_METHODS = ('can_place_piece', 'legal_moves', 'place_piece', '_check_lines',
+                     '_update_legal_moves', '_generate_pieces_set', '_has_available_moves')
+
+    def __init__(self):
+        self._callbacks = []
+        self.reset()
+
+    def reset(self):
+        for name in self.COUNTERS:
+            setattr(self, name, 0)
+        self.lines_per_move = Counter()
+        self.method_calls = Counter()
+        self.method_time = defaultdict(float)
+
+    def add_callback(self, callback):
+        self._callbacks.append(callback)
+
+    def remove_callback(self, callback):
+        self._callbacks.remove(callback)
+
+    def emit(self, event, **details):
+        for callback in self._callbacks:
+            callback(event, details)
+
+    def record_can_place(self, early, fits):
+        # Ранний отказ — неверный номер фигуры или позиция за краем поля,
+        # до индекса допустимых позиций дело не доходит
+        self.can_place_calls += 1
+        if early:
+            self.can_place_rejected_early += 1
+        elif not fits:
+            self.can_place_rejected += 1
+
+    def record_deal(self, checked):
+        self.deals += 1
+        self.placements_checked += checked
+        self.emit('deal', placements_checked=checked)
+
+    def record_update(self, checked):
+        self.placements_checked += checked
+
+    def record_move(self, blocks, lines):
+        self.moves += 1
+        self.lines_cleared += lines
+        self.lines_per_move[lines] += 1
+        self.emit('move', blocks=blocks, lines=lines)
+
+    def record_availability(self):
+        self.available_checks += 1
+
+    def record_game_over(self, score, moves):
+        self.games_over += 1
+        self.emit('game_over', score=score, moves=moves)
+
+    def timed(self, name, method):
+        """Обёртка метода с замером времени; Game ставит её только при timing=True"""
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.method_calls[name] += 1
+                self.method_time[name] += time.perf_counter() - start
+        return wrapper
+
+    def as_dict(self):
+        data = {name: getattr(self, name) for name in self.COUNTERS}
+        data['lines_per_move'] = {str(lines): count
+                                  for lines, count in sorted(self.lines_per_move.items())}
+        data['methods'] = {name: {'calls': self.method_calls[name],
+                                  'total_ms': self.method_time[name] * 1000,
+                                  'mean_us': self.method_time[name] * 1e6 / self.method_calls[name]}
+                           for name in sorted(self.method_calls)}
+        return data
+
+    def add(self, data):
+        """Прибавляет счётчики из as_dict(), например присланные из другого процесса"""
+        for name in self.COUNTERS:
+            setattr(self, name, getattr(self, name) + data[name])
+        for lines, count in data['lines_per_move'].items():
+            self.lines_per_move[int(lines)] += count
+        for name, method in data['methods'].items():
+            self.method_calls[name] += method['calls']
+            self.method_time[name] += method['total_ms'] / 1000
+
+
+# Коды движков поля в журналах и снимках: на диск пишется номер в этом кортеже,
+# поэтому новые движки только дописываются в конец, а коды старых не удаляются
+ENGINE_CODES = ('bitboard', 'list')
+
+
+class Game:
+    # Классовые константы
+    BASE_SCORE_PER_BLOCK = 10
+    BONUS_MULTIPLIER = 5
+    ENGINES = {
+        'list': ListBoard,
+        'bitboard': BitBoard
+    }
+
+    @classmethod
+    def get_default_settings(cls):
+        return {
+            'size': 10,
+            'uniform_color': False,
+            'block_color': (100, 200, 150),
+            'engine': 'bitboard'
+        }
+
+    def __init__(self, size=None, uniform_color=None, block_color=None, engine=None,
+                 seed=None, rng=None):
+        settings = self.get_default_settings()
+        self._size = size if size is not None else settings['size']
+        self._uniform_color = uniform_color if uniform_color is not None else settings['uniform_color']
+        self._block_color = block_color or settings['block_color']
+        self._engine = engine or settings['engine']
+        if self._engine not in self.ENGINES:
+            raise ValueError(f"Неизвестный движок поля: {self._engine}")
+
+        # Без явного зерна выбираем случайное, чтобы любую игру можно было повторить
+        if seed is None and rng is None:
+            seed = random.getrandbits(64)
+        self._seed = seed
+        self._dealer = Dealer(self._uniform_color, self._block_color, seed=seed, rng=rng)
+        self._stats = None
+        self._journal = None
+        self.reset_game()
+
+    def reset_game(self):
+        self._board = self.ENGINES[self._engine](self._size)
+        self._colors = [[None for _ in range(self._size)] for _ in range(self._size)]
+        self._row_fill = [0] * self._size
+        self._col_fill = [0] * self._size
+        self._score = 0
+        self._moves = 0
+        self._lines_cleared = 0
+        self._last_placed = frozenset()
+        self._last_cleared = frozenset()
+        self._last_cleared_colors = {}
+        self._state = GameState.PLAYING
+        self._pieces = []
+        self._piece_colors = []
+        self._piece_tables = []
+        self._legal = []
+        self._generate_pieces_set()
+        if self._journal is not None:
+            self._journal.record_reset()
+
+    @property
+    def size(self):
+        return self._size
+
+    @property
+    def uniform_color(self):
+        return self._uniform_color
+
+    @property
+    def block_color(self):
+        return self._block_color
+
+    @property
+    def engine(self):
+        return self._engine
+
+    @property
+    def seed(self):
+        return self._seed
+
+    @property
+    def dealer(self):
+        return self._dealer
+
+    @property
+    def stats(self):
+        """Подключённый EngineStats или None"""
+        return self._stats
+
+    def enable_stats(self, stats=None, timing=False):
+        """Включает счётчики; timing=True — ещё и время методов из
+        EngineStats.TIMED_METHODS. Возвращает объект статистики.
+
+        Выключенные счётчики стоят одну проверку на None в горячих методах,
+        а обёртки для замера времени ставятся только на этот экземпляр.
+        """
+        self.disable_stats()
+        self._stats = stats if stats is not None else EngineStats()
+        if timing:
+            for name in EngineStats.TIMED_METHODS:
+                setattr(self, name, self._stats.timed(name, getattr(self, name)))
+        return self._stats
+
+    def disable_stats(self):
+        for name in EngineStats.TIMED_METHODS:
+            self.__dict__.pop(name, None)
+        self._stats = None
+
+    @property
+    def journal(self):
+        """Подключённый журнал ходов или None"""
+        return self._journal
+
+    def attach_journal(self, journal):
+        """Подключает журнал: объект с методами record(slot, row, col) и record_reset().
+
+        Журнал воспроизводится с зерна, поэтому подключать его можно только
+        до первого хода (см. journal.start_journal).
+        """
+        if self._moves:
+            raise ValueError("Журнал подключается только до первого хода")
+        self._journal = journal
+
+    def detach_journal(self):
+        journal, self._journal = self._journal, None
+        return journal
+
+    def get_rng_state(self):
+        return self._dealer.get_state()
+
+    def set_rng_state(self, state):
+        self._dealer.set_state(state)
+
+    def load_position(self, bits, colors=None):
+        """Заменяет поле позицией bits (бит r * size + c — занятая клетка).
+
+        colors — список списков цветов; по умолчанию все блоки цвета block_color.
+        Фигуры, счёт и раздача остаются прежними, индекс допустимых позиций
+        строится заново. Заполненные линии не очищаются: позиция загружается как есть.
+        """
+        size = self._size
+        self._board = self.ENGINES[self._engine](size)
+        self._colors = [[None for _ in range(size)] for _ in range(size)]
+        self._row_fill = [0] * size
+        self._col_fill = [0] * size
+
+        # Клетки ставим одноблочной фигурой, чтобы не знать устройство поля
+        dot = PlacementTable.get(size, ((1,),))
+        for index in range(size * size):
+            if bits >> index & 1:
+                r, c = divmod(index, size)
+                self._board.place(dot.at(r, c))
+                self._colors[r][c] = colors[r][c] if colors else self._block_color
+                self._row_fill[r] += 1
+                self._col_fill[c] += 1
+
+        fits = self._board.fits
+        self._legal = [{p.index for p in table.placements if fits(p)}
+                       for table in self._piece_tables]
+        self._last_placed = frozenset()
+        self._last_cleared = frozenset()
+        self._last_cleared_colors = {}
+        self._state = GameState.PLAYING if any(self._legal) else GameState.GAME_OVER
+
+    def restore(self, bits, colors, pieces, piece_colors, score=0, moves=0, lines_cleared=0):
+        """Восстанавливает позицию целиком: поле, текущий набор фигур и счёт.
+
+        Следующая раздача пойдёт из текущего состояния генератора, поэтому
+        для продолжения той же игры его нужно восстановить через set_rng_state.
+        """
+        self._pieces = [tuple(map(tuple, shape)) for shape in pieces]
+        self._piece_colors = list(piece_colors)
+        self._piece_tables = [PlacementTable.get(self._size, shape) for shape in self._pieces]
+        self._score = score
+        self._moves = moves
+        self._lines_cleared = lines_cleared
+        self.load_position(bits, colors)
+
+    @property
+    def board(self):
+        return self._board.to_list()
+
+    @property
+    def board_bits(self):
+        """Поле одним числом: бит r * size + c установлен, если клетка занята"""
+        return self._board.to_bits()
+
+    @property
+    def colors(self):
+        return self._colors
+
+    @property
+    def score(self):
+        return self._score
+
+    @property
+    def moves(self):
+        return self._moves
+
+    @property
+    def lines_cleared(self):
+        return self._lines_cleared
+
+    @property
+    def last_placed(self):
+        """Клетки, занятые последним ходом (включая те, что сразу очистились)"""
+        return self._last_placed
+
+    @property
+    def last_cleared(self):
+        """Клетки, освобождённые очисткой линий на последнем ходу"""
+        return self._last_cleared
+
+    @property
+    def last_cleared_colors(self):
+        """Цвета клеток last_cleared до очистки, {(row, col): color}"""
+        return self._last_cleared_colors
+
+    @property
+    def state(self):
+        return self._state
+
+    @property
+    def pieces(self):
+        return self._pieces
+
+    @property
+    def piece_colors(self):
+        return self._piece_colors
+
+    @staticmethod
+    def get_all_shapes():
+        return BASE_SHAPES
+
+    def _generate_pieces_set(self):
+        orientations, self._piece_colors = self._dealer.deal()
+        self._pieces = []
+        self._piece_tables = []
+        self._legal = []
+
+        fits = self._board.fits
+        for orientation in orientations:
+            self._pieces.append(orientation.shape)
+            table = PlacementTable.get(self._size, orientation.shape)
+            self._piece_tables.append(table)
+            # Индекс допустимых позиций строится полностью только при раздаче
+            self._legal.append({p.index for p in table.placements if fits(p)})
+
+        if self._stats is not None:
+            self._stats.record_deal(sum(len(table.placements) for table in self._piece_tables))
+
+    def can_place_piece(self, piece_index, row, col):
+        if piece_index < 0 or piece_index >= len(self._pieces):
+            placement = None
+        else:
+            # Позиции вне поля в таблице отсутствуют, границы проверять не нужно
+            placement = self._piece_tables[piece_index].at(row, col)
+        fits = placement is not None and placement.index in self._legal[piece_index]
+
+        if self._stats is not None:
+            self._stats.record_can_place(placement is None, fits)
+        return fits
+
+    def legal_moves(self, piece_index):
+        """Возвращает все позиции (row, col), куда можно поставить фигуру"""
+        if piece_index < 0 or piece_index >= len(self._pieces):
+            return []
+        placements = self._piece_tables[piece_index].placements
+        return [(placements[i].row, placements[i].col)
+                for i in sorted(self._legal[piece_index])]
+
+    def place_piece(self, piece_index, row, col):
+        """Ставит фигуру и возвращает множество клеток, у которых изменился цвет.
+
+        Если фигуру поставить нельзя, возвращает пустое множество.
+        """
+        if not self.can_place_piece(piece_index, row, col):
+            return frozenset()
+
+        table = self._piece_tables[piece_index]
+        placement = table.at(row, col)
+        color = self._piece_colors[piece_index]
+
+        self._board.place(placement)
+        for r, c in placement.cells:
+            self._colors[r][c] = color
+            self._row_fill[r] += 1
+            self._col_fill[c] += 1
+
+        self._pieces.pop(piece_index)
+        self._piece_colors.pop(piece_index)
+        self._piece_tables.pop(piece_index)
+        self._legal.pop(piece_index)
+
+        rows_cleared, cols_cleared = self._check_lines(placement)
+        self._update_legal_moves(placement, rows_cleared, cols_cleared)
+
+        self._last_placed = frozenset(placement.cells)
+        self._last_cleared = frozenset(self._last_cleared_colors)
+
+        lines_cleared = len(rows_cleared) + len(cols_cleared)
+        self._score += move_score(table.blocks, lines_cleared, self._size)
+        self._moves += 1
+        self._lines_cleared += lines_cleared
+        if self._stats is not None:
+            self._stats.record_move(table.blocks, lines_cleared)
+        if self._journal is not None:
+            self._journal.record(piece_index, row, col)
+
+        if not self._pieces:
+            self._generate_pieces_set()
+
+        if not self._has_available_moves():
+            self._state = GameState.GAME_OVER
+            if self._stats is not None:
+                self._stats.record_game_over(self._score, self._moves)
+
+        return self._last_placed | self._last_cleared
+
+    def _check_lines(self, placement):
+        # Заполниться могли только строки и столбцы, которые задела фигура
+        size = self._size
+        rows_to_clear = [r for r in placement.rows if self._row_fill[r] == size]
+        cols_to_clear = [c for c in placement.cols if self._col_fill[c] == size]
+        if not rows_to_clear and not cols_to_clear:
+            self._last_cleared_colors = {}
+            return rows_to_clear, cols_to_clear
+
+        # Цвета запоминаем до очистки: по ним интерфейс гасит очищенные блоки
+        colors = self._colors
+        cleared_colors = {(r, c): colors[r][c] for r in rows_to_clear for c in range(size)}
+        cleared_colors.update(((r, c), colors[r][c]) for c in cols_to_clear for r in range(size))
+        self._last_cleared_colors = cleared_colors
+
+        self._board.clear_lines(rows_to_clear, cols_to_clear)
+
+        # Каждая очищенная строка забирает по блоку у каждого пересекаемого столбца
+        # и наоборот; сами очищенные линии обнуляются
+        for r in rows_to_clear:
+            self._row_fill[r] = 0
+        for c in cols_to_clear:
+            self._col_fill[c] = 0
+        if rows_to_clear:
+            for c in set(range(size)).difference(cols_to_clear):
+                self._col_fill[c] -= len(rows_to_clear)
+        if cols_to_clear:
+            for r in set(range(size)).difference(rows_to_clear):
+                self._row_fill[r] -= len(cols_to_clear)
+
+        for r in rows_to_clear:
+            self._colors[r] = [None] * self._size
+
+        for c in cols_to_clear:
+            for row in range(self._size):
+                self._colors[row][c] = None
+
+        return rows_to_clear, cols_to_clear
+
+    def _update_legal_moves(self, placement, rows_cleared, cols_cleared):
+        """Обновляет индекс допустимых позиций только для изменившихся клеток и линий"""
+        fits = self._board.fits
+        checked = 0
+        for table, legal in zip(self._piece_tables, self._legal):
+            # Позиции, задевающие новые блоки, становятся недоступными
+            for cell in placement.cells:
+                legal.difference_update(table.covering_cell(cell))
+
+            # Позиции на очищенных линиях могли освободиться — перепроверяем их
+            candidates = set()
+            for r in rows_cleared:
+                candidates.update(table.covering_row(r))
+            for c in cols_cleared:
+                candidates.update(table.covering_col(c))
+            placements = table.placements
+            candidates -= legal
+            checked += len(candidates)
+            legal.update(i for i in candidates if fits(placements[i]))
+
+        if self._stats is not None:
+            self._stats.record_update(checked)
+
+    def _has_available_moves(self):
+        if self._stats is not None:
+            self._stats.record_availability()
+        return any(self._legal)
+
+
+def move_score(blocks, lines, size):
+    """Очки за ход: за каждый блок фигуры и бонус за каждую очищенную линию"""
+    return blocks * Game.BASE_SCORE_PER_BLOCK + lines * size * Game.BONUS_MULTIPLIER
@@ -1,191 +1,27 @@
-import random
+import argparse
+import math
+import os
 import sys
-from enum import Enum
+import time
+from array import array
+from collections import OrderedDict, namedtuple
+
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
                              QPushButton, QLabel, QGridLayout, QMessageBox, QFrame, QDialog,
                              QSpinBox, QColorDialog, QFormLayout, QCheckBox, QComboBox)
 from PyQt5.QtCore import (Qt, QSize, QPropertyAnimation, QEasingCurve, QParallelAnimationGroup,
-                          QSequentialAnimationGroup, QTimer, QPoint)
+                          QSequentialAnimationGroup, QTimer, QPoint, QRect, QObject, QRunnable,
+                          QThreadPool, pyqtSignal)
 from PyQt5.QtGui import (QColor, QPainter, QBrush, QFont, QIcon, QPalette, QPen,
-                         QRadialGradient, QLinearGradient, QCursor)
-
-
-class GameState(Enum):
-    PLAYING = 1
-    GAME_OVER = 2
-
-    @staticmethod
-    def get_state_name(state):
-        return "Игра" if state == GameState.PLAYING else "Конец игры"
-
-
-class Game:
-    # Классовые константы
-    BASE_SCORE_PER_BLOCK = 10
-    BONUS_MULTIPLIER = 5
-
-    @classmethod
-    def get_default_settings(cls):
-        return {
-            'size': 10,
-            'uniform_color': False,
-            'block_color': (100, 200, 150)
-        }
-
-    def __init__(self, size=None, uniform_color=None, block_color=None):
-        settings = self.get_default_settings()
-        self._size = size if size is not None else settings['size']
-        self._uniform_color = uniform_color if uniform_color is not None else settings['uniform_color']
-        self._block_color = block_color or settings['block_color']
-        self.reset_game()
-
-    def reset_game(self):
-        self._board = [[0 for _ in range(self._size)] for _ in range(self._size)]
-        self._colors = [[None for _ in range(self._size)] for _ in range(self._size)]
-        self._score = 0
-        self._state = GameState.PLAYING
-        self._pieces = []
-        self._piece_colors = []
-        self._generate_pieces_set()
-
-    @property
-    def size(self):
-        return self._size
-
-    @property
-    def board(self):
-        return self._board
-
-    @property
-    def colors(self):
-        return self._colors
-
-    @property
-    def score(self):
-        return self._score
-
-    @property
-    def state(self):
-        return self._state
-
-    @property
-    def pieces(self):
-        return self._pieces
-
-    @property
-    def piece_colors(self):
-        return self._piece_colors
-
-    @staticmethod
-    def get_all_shapes():
-        return [
-            [[1]], [[1, 1]], [[1, 1, 1]], [[1, 1], [1, 1]],
-            [[1, 1, 1, 1]], [[1, 1, 1], [1, 0, 0]], [[1, 1, 0], [0, 1, 1]],
-            [[1, 1, 1], [0, 1, 0]], [[1, 1, 1, 1, 1]], [[1], [1], [1], [1], [1]],
-            [[1, 0], [1, 1], [0, 1]], [[1, 1, 1], [0, 1, 0], [0, 1, 0]],
-            [[1, 1, 1, 1], [0, 0, 0, 1]], [[1, 1, 1], [1, 0, 1]],
-            [[1, 1], [1, 0], [1, 1]], [[1, 0, 1], [1, 1, 1]],
-            [[1, 1, 1, 1, 1, 1]], [[1], [1], [1], [1], [1], [1]],
-            [[1, 1, 1], [1, 1, 1]], [[1, 1], [1, 1], [1, 1]]
-        ]
-
-    def _generate_pieces_set(self):
-        self._pieces = []
-        self._piece_colors = []
-
-        for _ in range(3):  # Всегда 3 фигуры в наборе
-            shape = random.choice(self.get_all_shapes())
-            # Случайный поворот/отражение
-            for _ in range(random.randint(0, 3)):
-                shape = [list(row) for row in zip(*shape[::-1])]
-            self._pieces.append(shape)
-            self._piece_colors.append(
-                self._block_color if self._uniform_color else self._random_color()
-            )
-
-    @staticmethod
-    def _random_color():
-        return (
-            random.randint(50, 255),
-            random.randint(50, 255),
-            random.randint(50, 255)
-        )
+                         QRadialGradient, QLinearGradient, QCursor, QPixmap)
 
-    def can_place_piece(self, piece_index, row, col):
-        if piece_index < 0 or piece_index >= len(self._pieces):
-            return False
-
-        piece = self._pieces[piece_index]
-        piece_height = len(piece)
-        piece_width = len(piece[0]) if piece_height > 0 else 0
-
-        if (row < 0 or col < 0 or
-                row + piece_height > self._size or
-                col + piece_width > self._size):
-            return False
-
-        for r in range(piece_height):
-            for c in range(piece_width):
-                if piece[r][c] and self._board[row + r][col + c]:
-                    return False
-        return True
-
-    def place_piece(self, piece_index, row, col):
-        if not self.can_place_piece(piece_index, row, col):
-            return False
-
-        piece = self._pieces[piece_index]
-        color = self._piece_colors[piece_index]
-
-        blocks_placed = sum(sum(row) for row in piece)
-        self._score += blocks_placed * self.BASE_SCORE_PER_BLOCK
-
-        for r in range(len(piece)):
-            for c in range(len(piece[r])):
-                if piece[r][c]:
-                    self._board[row + r][col + c] = 1
-                    self._colors[row + r][col + c] = color
+from ai import BEAM_WIDTH, SearchPlayer
+from engine import Game, GameState, PlacementTable, PIECES_PER_SET
+from journal import start_journal
+from records import GameRecord, RECORDS_PATH, ScoreStore, ScoreWriter
+from snapshot import Autosaver, SnapshotError, load_game, pack_game
 
-        self._pieces.pop(piece_index)
-        self._piece_colors.pop(piece_index)
-
-        lines_cleared = self._check_lines()
-        if lines_cleared > 0:
-            self._score += lines_cleared * self._size * self.BONUS_MULTIPLIER
-
-        if not self._pieces:
-            self._generate_pieces_set()
-
-        if not self._has_available_moves():
-            self._state = GameState.GAME_OVER
-
-        return True
-
-    def _check_lines(self):
-        lines_cleared = 0
-
-        rows_to_clear = [r for r in range(self._size) if all(self._board[r])]
-        cols_to_clear = [c for c in range(self._size)
-                         if all(self._board[row][c] for row in range(self._size))]
-
-        for r in rows_to_clear:
-            self._board[r] = [0] * self._size
-            self._colors[r] = [None] * self._size
-
-        for c in cols_to_clear:
-            for row in range(self._size):
-                self._board[row][c] = 0
-                self._colors[row][c] = None
-
-        return len(rows_to_clear) + len(cols_to_clear)
-
-    def _has_available_moves(self):
-        for piece_index, piece in enumerate(self._pieces):
-            for r in range(self._size):
-                for c in range(self._size):
-                    if self.can_place_piece(piece_index, r, c):
-                        return True
-        return False
+AUTOSAVE_PATH = os.path.join(os.path.expanduser('~'), '.block_blast', 'autosave.bbs')
 
 
 class SettingsDialog(QDialog):
@@ -196,7 +32,7 @@ class SettingsDialog(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setWindowTitle("Настройки игры")
-        self.setFixedSize(350, 250)
+        self.setFixedSize(350, 280)
         self.selected_color = self.get_default_color()
         self._setup_ui()
 
@@ -224,6 +60,12 @@ class SettingsDialog(QDialog):
         self.theme_combo.addItem("Светлая", "light")
         layout.addRow("Тема приложения:", self.theme_combo)
 
+        # Способ отрисовки поля
+        self.board_view_combo = QComboBox()
+        self.board_view_combo.addItem("Сетка виджетов", "grid")
+        self.board_view_combo.addItem("Один виджет (QPainter)", "painter")
+        layout.addRow("Отрисовка поля:", self.board_view_combo)
+
         # Кнопки OK/Отмена
         buttons = QHBoxLayout()
         ok_btn = QPushButton("ОК")
@@ -250,118 +92,415 @@ class SettingsDialog(QDialog):
         )
 
 
+class SpriteCache:
+    """Готовые изображения клеток и блоков.
+
+    Ключ — (вид, цвет, размер клетки, уровень свечения, тема, плотность
+    пикселей экрана). Градиенты и сглаженные прямоугольники рисуются один раз,
+    дальше клетка выводится одним drawPixmap. Давно не использованные
+    изображения вытесняются, поэтому режим случайных цветов не раздувает кэш.
+    """
+    MAX_ENTRIES = 512
+    GLOW_LEVELS = 8
+    EMPTY_COLORS = {
+        'dark': ((60, 60, 60), (80, 80, 80)),
+        'light': ((205, 205, 205), (180, 180, 180))
+    }
+
+    def __init__(self, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.theme = 'dark'
+        self.hits = 0
+        self.misses = 0
+        self._sprites = OrderedDict()
+
+    def __len__(self):
+        return len(self._sprites)
+
+    def clear(self):
+        self._sprites.clear()
+
+    def _glow_level(self, glow):
+        # Свечение анимируется плавно, а изображения храним для нескольких уровней
+        if glow is None:
+            return None
+        return max(0, min(self.GLOW_LEVELS, round(glow * self.GLOW_LEVELS)))
+
+    def _get(self, kind, color, size, glow_level, dpr, render):
+        key = (kind, color, size, glow_level, self.theme, dpr)
+        sprite = self._sprites.get(key)
+        if sprite is not None:
+            self._sprites.move_to_end(key)
+            self.hits += 1
+            return sprite
+
+        self.misses += 1
+        sprite = QPixmap(math.ceil(size * dpr), math.ceil(size * dpr))
+        sprite.setDevicePixelRatio(dpr)
+        sprite.fill(Qt.transparent)
+        painter = QPainter(sprite)
+        painter.setRenderHint(QPainter.Antialiasing)
+        glow = glow_level / self.GLOW_LEVELS if glow_level is not None else None
+        render(painter, color, size, glow)
+        painter.end()
+
+        self._sprites[key] = sprite
+        if len(self._sprites) > self.max_entries:
+            self._sprites.popitem(last=False)
+        return sprite
+
+    def cell(self, size, hint_color=None, dpr=1.0):
+        """Пустая ячейка поля, при необходимости с подсветкой подсказки"""
+        return self._get('cell', hint_color, size, None, dpr, self._render_cell)
+
+    def block(self, size, color, glow=None, dpr=1.0):
+        """Блок поля; glow=None — плоская заливка, иначе градиент со свечением"""
+        return self._get('block', color, size, self._glow_level(glow), dpr, self._render_block)
+
+    def piece(self, size, color, glow=False, dpr=1.0):
+        """Клетка фигуры на панели или при перетаскивании (с полем в 1 пиксель)"""
+        return self._get('piece', color, size, self.GLOW_LEVELS if glow else 0, dpr,
+                         self._render_piece)
+
+    def piece_image(self, shape, color, size, glow=False, dpr=1.0):
+        """Фигура целиком, вписанная по центру в квадрат size×size"""
+        return self._get('shape', (shape, color), size, self.GLOW_LEVELS if glow else 0, dpr,
+                         self._render_shape)
+
+    def _render_cell(self, painter, hint_color, size, glow):
+        fill, border = self.EMPTY_COLORS[self.theme]
+        painter.setBrush(QBrush(QColor(*fill)))
+        painter.setPen(QPen(QColor(*border), 1))
+        painter.drawRoundedRect(2, 2, size - 4, size - 4, 5, 5)
+
+        if hint_color:
+            pen = QPen(QColor(255, 255, 255, 200), 2)
+            pen.setStyle(Qt.DashLine)
+            painter.setBrush(QBrush(QColor(*hint_color, 110)))
+            painter.setPen(pen)
+            painter.drawRoundedRect(3, 3, size - 6, size - 6, 5, 5)
+
+    @staticmethod
+    def _render_block(painter, color, size, glow):
+        if glow is not None:
+            grad = QRadialGradient(size / 2, size / 2, size * 4 / 7)
+            grad.setColorAt(0, QColor(255, 100, 100, int(200 * glow)))
+            grad.setColorAt(0.7, QColor(*color))
+            grad.setColorAt(1, QColor(*color).darker(150))
+            painter.setBrush(QBrush(grad))
+        else:
+            painter.setBrush(QBrush(QColor(*color)))
+        painter.setPen(QPen(QColor(0, 0, 0, 100), 1))
+        painter.drawRoundedRect(2, 2, size - 4, size - 4, 5, 5)
+
+    @staticmethod
+    def _render_piece(painter, color, size, glow):
+        inner = size - 2
+        grad = QRadialGradient(1 + inner / 2, 1 + inner / 2, inner / 2)
+        if glow:
+            grad.setColorAt(0, QColor(255, 150, 150))
+            grad.setColorAt(0.7, QColor(*color))
+        else:
+            grad.setColorAt(0, QColor(*color))
+        grad.setColorAt(1, QColor(*color).darker(150))
+        painter.setBrush(QBrush(grad))
+        painter.setPen(QPen(QColor(0, 0, 0, 120), 1))
+        painter.drawRoundedRect(1, 1, inner, inner, 5, 5)
+
+    def _render_shape(self, painter, key, size, glow):
+        shape, color = key
+        rows = len(shape)
+        cols = max(len(row) for row in shape)
+        # Поле в 10 пикселей с каждой стороны, клетка не крупнее 30 пикселей
+        cell_size = min(30, (size - 20) / cols, (size - 20) / rows)
+        x_offset = (size - cols * cell_size) / 2
+        y_offset = (size - rows * cell_size) / 2
+        # Изображение клетки на пиксель шире с каждой стороны: там рисуется обводка
+        sprite = self.piece(int(cell_size - 4) + 2, color, bool(glow),
+                            painter.device().devicePixelRatioF())
+
+        for r in range(rows):
+            for c in range(len(shape[r])):
+                if shape[r][c]:
+                    painter.drawPixmap(int(x_offset + c * cell_size) - 1,
+                                       int(y_offset + r * cell_size) - 1, sprite)
+
+
+SPRITES = SpriteCache()
+
+
+def paint_cell(painter, x, y, size, color, hint_color=None):
+    """Рисует клетку поля без анимаций: блок цвета color или пустую ячейку"""
+    dpr = painter.device().devicePixelRatioF()
+    if color:
+        painter.drawPixmap(x, y, SPRITES.block(size, tuple(color), None, dpr))
+    else:
+        painter.drawPixmap(x, y, SPRITES.cell(size, hint_color, dpr))
+
+
+CellEffect = namedtuple('CellEffect', ['scale', 'rotation', 'glow', 'opacity', 'shake', 'color'])
+
+
+def paint_effect(painter, x, y, size, color, effect):
+    """Рисует блок в кадре анимации: масштаб, поворот, свечение, прозрачность, тряска"""
+    half = size / 2
+    sprite = SPRITES.block(size, tuple(color), effect.glow, painter.device().devicePixelRatioF())
+    painter.save()
+    painter.setRenderHint(QPainter.SmoothPixmapTransform)
+    painter.setOpacity(effect.opacity)
+    painter.translate(x + half + effect.shake, y + half)
+    painter.rotate(effect.rotation)
+    painter.scale(effect.scale, effect.scale)
+    painter.translate(-half, -half)
+    painter.drawPixmap(0, 0, sprite)
+    painter.restore()
+
+
 class BlockWidget(QWidget):
     BLOCK_SIZE = 35
-    GLOW_DURATION = 800
 
     def __init__(self, color=None, parent=None):
         super().__init__(parent)
         self.color = color
         self.setFixedSize(self.BLOCK_SIZE, self.BLOCK_SIZE)
-        self.scale = 1.0
-        self.opacity = 1.0
-        self.rotation = 0
-        self.shake_offset = 0
-        self.glow = 0
-        self.last_placed = False
-        self._setup_animations()
-
-    def _setup_animations(self):
-        self.pulse_anim = QPropertyAnimation(self, b"glow")
-        self.pulse_anim.setDuration(self.GLOW_DURATION)
-        self.pulse_anim.setLoopCount(-1)
-        self.pulse_anim.setKeyValueAt(0, 0.3)
-        self.pulse_anim.setKeyValueAt(0.5, 1.0)
-        self.pulse_anim.setKeyValueAt(1, 0.3)
+        self.effect = None
+        self.hint_color = None
 
     def paintEvent(self, event):
         painter = QPainter(self)
         painter.setRenderHint(QPainter.Antialiasing)
 
-        if self.color:
-            r, g, b = self.color
-            if self.last_placed or self.glow > 0:
-                grad = QRadialGradient(17, 17, 20)
-                glow_color = QColor(255, 100, 100, int(200 * self.glow))
-                grad.setColorAt(0, glow_color)
-                grad.setColorAt(0.7, QColor(r, g, b))
-                grad.setColorAt(1, QColor(r, g, b).darker(150))
-                painter.setBrush(QBrush(grad))
-            else:
-                painter.setBrush(QBrush(QColor(r, g, b)))
-
-            painter.setPen(QPen(QColor(0, 0, 0, 100), 1))
-            painter.save()
-            painter.translate(17, 17)
-            painter.rotate(self.rotation)
-            painter.scale(self.scale, self.scale)
-            painter.translate(-17, -17)
-            painter.drawRoundedRect(2, 2, 31, 31, 5, 5)
-            painter.restore()
-        else:
-            painter.setBrush(QBrush(QColor(60, 60, 60)))
-            painter.setPen(QPen(QColor(80, 80, 80), 1))
-            painter.drawRoundedRect(2, 2, 31, 31, 5, 5)
+        effect = self.effect
+        if effect is None:
+            paint_cell(painter, 0, 0, self.BLOCK_SIZE, self.color, self.hint_color)
+            return
 
-    def animate_place(self):
-        self.last_placed = True
-        self.pulse_anim.start()
+        # Под анимированным блоком видна пустая ячейка: блок может быть
+        # уменьшен, повёрнут или наполовину прозрачен
+        paint_cell(painter, 0, 0, self.BLOCK_SIZE, None, self.hint_color)
+        color = effect.color or self.color
+        if color:
+            paint_effect(painter, 0, 0, self.BLOCK_SIZE, color, effect)
 
-        group = QParallelAnimationGroup()
+    def set_color(self, color):
+        if color != self.color:
+            self.color = color
+            self.update()
 
-        scale_anim = QPropertyAnimation(self, b"scale")
-        scale_anim.setDuration(400)
-        scale_anim.setStartValue(0.3)
-        scale_anim.setEndValue(1.0)
-        scale_anim.setEasingCurve(QEasingCurve.OutBack)
-        group.addAnimation(scale_anim)
-
-        rotate_anim = QPropertyAnimation(self, b"rotation")
-        rotate_anim.setDuration(600)
-        rotate_anim.setStartValue(-180)
-        rotate_anim.setEndValue(0)
-        rotate_anim.setEasingCurve(QEasingCurve.OutElastic)
-        group.addAnimation(rotate_anim)
-
-        glow_anim = QPropertyAnimation(self, b"glow")
-        glow_anim.setDuration(self.GLOW_DURATION)
-        glow_anim.setStartValue(1.0)
-        glow_anim.setEndValue(0.0)
-        glow_anim.setEasingCurve(QEasingCurve.OutCubic)
-        group.addAnimation(glow_anim)
+    def set_hint(self, color):
+        self.hint_color = color
+        self.update()
 
-        group.start()
-        QTimer.singleShot(1500, lambda: setattr(self, 'last_placed', False))
+    def set_effect(self, effect):
+        """Кадр анимации от AnimationClock; None — анимация закончилась"""
+        self.effect = effect
+        self.update()
 
-    def animate_clear(self):
-        group = QParallelAnimationGroup()
 
-        shake = QPropertyAnimation(self, b"shake_offset")
-        shake.setDuration(500)
-        shake.setKeyValueAt(0, 0)
-        shake.setKeyValueAt(0.1, -5)
-        shake.setKeyValueAt(0.2, 5)
-        shake.setKeyValueAt(0.3, -5)
-        shake.setKeyValueAt(0.4, 5)
-        shake.setKeyValueAt(0.5, 0)
-        group.addAnimation(shake)
-
-        fade = QPropertyAnimation(self, b"opacity")
-        fade.setDuration(500)
-        fade.setStartValue(1.0)
-        fade.setEndValue(0.0)
-        group.addAnimation(fade)
+class BlockGridView(QWidget):
+    """Поле из сетки BlockWidget: у каждой клетки свой виджет и свои анимации"""
+    cellClicked = pyqtSignal(int, int)
 
-        scale = QPropertyAnimation(self, b"scale")
-        scale.setDuration(500)
-        scale.setStartValue(1.0)
-        scale.setEndValue(0.5)
-        group.addAnimation(scale)
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.grid = QGridLayout()
+        self.grid.setSpacing(2)
+        self.grid.setContentsMargins(0, 0, 0, 0)
+        self.setLayout(self.grid)
+        self.cells = []
+        self._hint_cells = []
+
+    def _build(self, game):
+        # Старые клетки удаляем явно, иначе они копятся до сборки мусора
+        for row in self.cells:
+            for cell in row:
+                self.grid.removeWidget(cell)
+                cell.deleteLater()
+
+        self.cells = []
+        for row in range(game.size):
+            cells_row = []
+            for col in range(game.size):
+                cell = BlockWidget(game.colors[row][col])
+                cell.mousePressEvent = lambda e, r=row, c=col: self.cellClicked.emit(r, c)
+                self.grid.addWidget(cell, row, col)
+                cells_row.append(cell)
+            self.cells.append(cells_row)
+        self._hint_cells = []
+
+    def update_cells(self, game, changed=None):
+        """Перекрашивает клетки из changed; без него — всё поле.
+
+        Виджеты клеток создаются заново только при смене размера поля.
+        """
+        if len(self.cells) != game.size:
+            self._build(game)
+            return
 
-        group.start()
+        if changed is None:
+            changed = [(r, c) for r in range(game.size) for c in range(game.size)]
+        for r, c in changed:
+            self.cells[r][c].set_color(game.colors[r][c])
+
+    def cell_rect(self, row, col):
+        return self.cells[row][col].geometry()
+
+    def cell_at(self, pos):
+        widget = self.childAt(pos)
+        if not isinstance(widget, BlockWidget):
+            return None
+        row, col, _, _ = self.grid.getItemPosition(self.grid.indexOf(widget))
+        return row, col
+
+    def set_cell_effects(self, effects):
+        for r, c, effect in effects:
+            self.cells[r][c].set_effect(effect)
+
+    def show_hint(self, cells, color):
+        self.clear_hint()
+        self._hint_cells = list(cells)
+        for r, c in self._hint_cells:
+            self.cells[r][c].set_hint(color)
+
+    def clear_hint(self):
+        for r, c in self._hint_cells:
+            self.cells[r][c].set_hint(None)
+        self._hint_cells = []
+
+
+class BoardView(QWidget):
+    """Поле одним виджетом: все клетки рисуются в одном paintEvent.
+
+    Клетка под курсором вычисляется арифметически, а при изменениях
+    перерисовываются только прямоугольники изменившихся клеток.
+    """
+    cellClicked = pyqtSignal(int, int)
+    CELL_SPACING = 2
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.game = None
+        self._pitch = BlockWidget.BLOCK_SIZE + self.CELL_SPACING
+        self._origin = QPoint(0, 0)
+        self._hint_cells = set()
+        self._hint_color = None
+        self._effects = {}
+
+    def sizeHint(self):
+        size = self.game.size if self.game else Game.get_default_settings()['size']
+        pitch = BlockWidget.BLOCK_SIZE + self.CELL_SPACING
+        return QSize(size * pitch, size * pitch)
+
+    def _update_geometry(self):
+        if self.game is None:
+            return
+        size = self.game.size
+        # Клетки масштабируются под доступное место, поле центрируется
+        self._pitch = max(4, min(self.width(), self.height()) // size)
+        self._origin = QPoint((self.width() - self._pitch * size) // 2,
+                              (self.height() - self._pitch * size) // 2)
+
+    def resizeEvent(self, event):
+        self._update_geometry()
+        super().resizeEvent(event)
+
+    def cell_rect(self, row, col):
+        return QRect(self._origin.x() + col * self._pitch, self._origin.y() + row * self._pitch,
+                     self._pitch, self._pitch)
+
+    def cell_at(self, pos):
+        if self.game is None:
+            return None
+        x = pos.x() - self._origin.x()
+        y = pos.y() - self._origin.y()
+        if x < 0 or y < 0:
+            return None
+        row, col = y // self._pitch, x // self._pitch
+        if row >= self.game.size or col >= self.game.size:
+            return None
+        return row, col
+
+    def update_cells(self, game, changed=None):
+        if game is not self.game or changed is None:
+            resized = self.game is None or game.size != self.game.size
+            self.game = game
+            self._hint_cells = set()
+            self._effects = {}
+            if resized:
+                self.updateGeometry()
+                self._update_geometry()
+            self.update()
+            return
+
+        for r, c in changed:
+            self.update(self.cell_rect(r, c))
+
+    def _effect_rect(self, row, col):
+        # Повёрнутый, увеличенный или трясущийся блок выходит за свою клетку
+        margin = self._pitch // 2
+        return self.cell_rect(row, col).adjusted(-margin, -margin, margin, margin)
+
+    def set_cell_effects(self, effects):
+        for r, c, effect in effects:
+            self.update(self._effect_rect(r, c))
+            if effect is None:
+                self._effects.pop((r, c), None)
+            else:
+                self._effects[(r, c)] = effect
+
+    def show_hint(self, cells, color):
+        self.clear_hint()
+        self._hint_cells = set(cells)
+        self._hint_color = color
+        for r, c in self._hint_cells:
+            self.update(self.cell_rect(r, c))
+
+    def clear_hint(self):
+        for r, c in self._hint_cells:
+            self.update(self.cell_rect(r, c))
+        self._hint_cells = set()
+        self._hint_color = None
+
+    def mousePressEvent(self, event):
+        cell = self.cell_at(event.pos())
+        if cell is not None:
+            self.cellClicked.emit(*cell)
+
+    def paintEvent(self, event):
+        if self.game is None:
+            return
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+
+        # Рисуем только клетки, попавшие в грязный прямоугольник; соседние
+        # берём с запасом, потому что анимированные блоки выходят за клетку
+        rect = event.rect()
+        size = self.game.size
+        pitch = self._pitch
+        first_row = max(0, (rect.top() - self._origin.y()) // pitch - 1)
+        last_row = min(size - 1, (rect.bottom() - self._origin.y()) // pitch + 1)
+        first_col = max(0, (rect.left() - self._origin.x()) // pitch - 1)
+        last_col = min(size - 1, (rect.right() - self._origin.x()) // pitch + 1)
+
+        colors = self.game.colors
+        cell_size = pitch - self.CELL_SPACING
+        for r in range(first_row, last_row + 1):
+            for c in range(first_col, last_col + 1):
+                hint = self._hint_color if (r, c) in self._hint_cells else None
+                color = None if (r, c) in self._effects else colors[r][c]
+                paint_cell(painter, self._origin.x() + c * pitch, self._origin.y() + r * pitch,
+                           cell_size, color, hint)
+
+        # Анимированные блоки рисуются поверх статичных клеток
+        for (r, c), effect in self._effects.items():
+            color = effect.color or colors[r][c]
+            if color and first_row <= r <= last_row and first_col <= c <= last_col:
+                paint_effect(painter, self._origin.x() + c * pitch, self._origin.y() + r * pitch,
+                             cell_size, color, effect)
 
 
 class DraggablePieceWidget(QWidget):
+    pressed = pyqtSignal()
     PIECE_SIZE = 130
     HOVER_SCALE = 1.1
     HOVER_BOUNCE_HEIGHT = -8
@@ -379,15 +518,6 @@ class DraggablePieceWidget(QWidget):
         self.scale = 1.0
         self.y_offset = 0
         self.glow = 0
-        self._setup_animations()
-
-    def _setup_animations(self):
-        self.pulse_anim = QPropertyAnimation(self, b"glow")
-        self.pulse_anim.setDuration(self.PULSE_DURATION)
-        self.pulse_anim.setLoopCount(-1)
-        self.pulse_anim.setKeyValueAt(0, 0.3)
-        self.pulse_anim.setKeyValueAt(0.5, 1.0)
-        self.pulse_anim.setKeyValueAt(1, 0.3)
 
     def paintEvent(self, event):
         painter = QPainter(self)
@@ -410,77 +540,60 @@ class DraggablePieceWidget(QWidget):
         if not self.piece or self.dragging:
             return
 
-        rows = len(self.piece)
-        cols = max(len(row) for row in self.piece) if rows > 0 else 0
-        cell_size = min(30, 110 / max(cols, 1), 110 / max(rows, 1))
-
-        x_offset = (self.width() - cols * cell_size) / 2
-        y_offset = (self.height() - rows * cell_size) / 2 + self.y_offset
+        # Фигура рисуется один раз и дальше берётся из кэша
+        image = SPRITES.piece_image(tuple(map(tuple, self.piece)), tuple(self.color),
+                                    self.PIECE_SIZE, self.glow > 0.1, self.devicePixelRatioF())
+        painter.drawPixmap(0, int(self.y_offset), image)
 
-        for r in range(rows):
-            for c in range(len(self.piece[r])):
-                if self.piece[r][c]:
-                    x = x_offset + c * cell_size
-                    y = y_offset + r * cell_size
-                    size = cell_size - 4
-
-                    grad = QRadialGradient(x + size / 2, y + size / 2, size / 2)
-                    if self.glow > 0.1:
-                        grad.setColorAt(0, QColor(255, 150, 150))
-                        grad.setColorAt(0.7, QColor(*self.color))
-                    else:
-                        grad.setColorAt(0, QColor(*self.color))
-                    grad.setColorAt(1, QColor(*self.color).darker(150))
-
-                    painter.setBrush(QBrush(grad))
-                    painter.setPen(QPen(QColor(0, 0, 0, 120), 1))
-                    painter.drawRoundedRect(int(x), int(y), int(size), int(size), 5, 5)
+    def set_piece(self, piece, color):
+        """Меняет фигуру в слоте; пустой слот — piece=[]"""
+        if piece == self.piece and color == self.color:
+            return
+        self.piece = piece
+        self.color = color
+        self.selected = False
+        self.dragging = False
+        self.glow = 0
+        self.update()
 
     def paintDraggedPiece(self, painter, pos):
         rows = len(self.piece)
-        cols = max(len(row) for row in self.piece) if rows > 0 else 0
-        cell_size = 30
+        cell_size = DragOverlay.CELL_SIZE
+        sprite = SPRITES.piece(cell_size - 4 + 2, tuple(self.color), False,
+                               painter.device().devicePixelRatioF())
 
         for r in range(rows):
             for c in range(len(self.piece[r])):
                 if self.piece[r][c]:
                     x = pos.x() + c * cell_size - self.drag_offset.x()
                     y = pos.y() + r * cell_size - self.drag_offset.y()
-                    size = cell_size - 4
-
-                    grad = QRadialGradient(x + size / 2, y + size / 2, size / 2)
-                    grad.setColorAt(0, QColor(*self.color))
-                    grad.setColorAt(1, QColor(*self.color).darker(150))
-
-                    painter.setBrush(QBrush(grad))
-                    painter.setPen(QPen(QColor(0, 0, 0, 120), 1))
-                    painter.drawRoundedRect(int(x), int(y), int(size), int(size), 5, 5)
+                    painter.drawPixmap(x - 1, y - 1, sprite)
 
     def mousePressEvent(self, event):
         if event.button() == Qt.LeftButton:
-            self.dragging = True
-            self.drag_offset = event.pos()
-            self.setCursor(Qt.ClosedHandCursor)
-            self.update()
+            # Щелчок выбирает фигуру, а если мышь поведут — начнётся перетаскивание
+            self.pressed.emit()
+            if self.piece:
+                self.dragging = True
+                self.drag_offset = event.pos()
+                self.setCursor(Qt.ClosedHandCursor)
+                self.update()
 
     def mouseMoveEvent(self, event):
         if self.dragging:
             main_window = self.window()
-            if hasattr(main_window, 'dragged_piece_pos'):
-                main_window.dragged_piece_pos = event.globalPos()
-                main_window.dragged_piece = self
-                main_window.update()
+            if hasattr(main_window, 'drag_piece'):
+                main_window.drag_piece(self, event.globalPos())
 
     def mouseReleaseEvent(self, event):
         if self.dragging and event.button() == Qt.LeftButton:
             self.dragging = False
             self.setCursor(Qt.ArrowCursor)
+            self.update()
 
             main_window = self.window()
-            if hasattr(main_window, 'dragged_piece'):
-                main_window.handle_piece_drop(event.globalPos())
-                main_window.dragged_piece = None
-                main_window.update()
+            if hasattr(main_window, 'drop_piece'):
+                main_window.drop_piece(event.globalPos())
 
     def enterEvent(self, event):
         self.hovered = True
@@ -527,17 +640,317 @@ class DraggablePieceWidget(QWidget):
         anim.start()
 
     def set_selected(self, selected):
+        # Пульсацию рамки ведёт AnimationClock главного окна
         self.selected = selected
-        if selected:
-            self.pulse_anim.start()
-        else:
-            self.pulse_anim.stop()
+        self.glow = 0
+        self.update()
+
+    def set_glow(self, glow):
+        self.glow = glow
         self.update()
 
 
+class DragOverlay(QWidget):
+    """Прозрачный слой поверх окна: перетаскиваемая фигура и превью хода.
+
+    При движении мыши перерисовывается только объединение старого и нового
+    прямоугольников фигуры и подсветки, а не всё окно.
+    """
+    CELL_SIZE = 30
+    FIT_COLOR = (80, 220, 120)
+    BLOCKED_COLOR = (230, 70, 70)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setAttribute(Qt.WA_TransparentForMouseEvents)
+        self.piece_widget = None
+        self._pos = None
+        self._preview = []
+        self._fits = False
+        self._painted = QRect()
+
+    def move_piece(self, piece_widget, pos, preview=(), fits=False):
+        """pos — курсор в координатах слоя, preview — прямоугольники клеток поля под фигурой"""
+        self.piece_widget = piece_widget
+        self._pos = pos
+        self._preview = list(preview)
+        self._fits = fits
+
+        bounds = self._bounds()
+        self.update(self._painted.united(bounds))
+        self._painted = bounds
+
+    def clear(self):
+        self.update(self._painted)
+        self.piece_widget = None
+        self._pos = None
+        self._preview = []
+        self._painted = QRect()
+
+    def _bounds(self):
+        piece = self.piece_widget.piece
+        offset = self.piece_widget.drag_offset
+        cols = max(len(row) for row in piece)
+        # Спрайты клеток фигуры на пиксель шире клетки с каждой стороны
+        bounds = QRect(self._pos.x() - offset.x() - 1, self._pos.y() - offset.y() - 1,
+                       cols * self.CELL_SIZE + 2, len(piece) * self.CELL_SIZE + 2)
+        for rect in self._preview:
+            bounds = bounds.united(rect)
+        return bounds
+
+    def paintEvent(self, event):
+        if self.piece_widget is None:
+            return
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+
+        if self._preview:
+            color = self.FIT_COLOR if self._fits else self.BLOCKED_COLOR
+            painter.setPen(QPen(QColor(*color), 2))
+            painter.setBrush(QBrush(QColor(*color, 70)))
+            for rect in self._preview:
+                painter.drawRoundedRect(rect.adjusted(2, 2, -2, -2), 5, 5)
+
+        self.piece_widget.paintDraggedPiece(painter, self._pos)
+
+
+class AnimationClock(QObject):
+    """Единые часы анимаций главного окна.
+
+    Вместо отдельных QPropertyAnimation на каждую клетку один таймер с частотой
+    обновления экрана продвигает все активные эффекты за проход. Состояние
+    клеток лежит в компактных массивах (вид эффекта и время старта),
+    представлению поля отдаются только изменившиеся клетки. Когда анимировать
+    нечего, таймер остановлен и не просыпается.
+    """
+    NONE, PLACE, CLEAR = 0, 1, 2
+    PLACE_SCALE_DURATION = 0.4
+    PLACE_ROTATE_DURATION = 0.6
+    PLACE_GLOW_DURATION = 0.8
+    CLEAR_DURATION = 0.5
+    SHAKE_KEYS = ((0.0, 0), (0.1, -5), (0.2, 5), (0.3, -5), (0.4, 5), (0.5, 0))
+    DEFAULT_REFRESH_RATE = 60
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.view = None
+        self.size = 0
+        self._kinds = bytearray()
+        self._starts = array('d')
+        self._clear_colors = {}
+        self._active = set()
+        self._pulses = {}
+        self.frames = 0
+
+        self._out_back = QEasingCurve(QEasingCurve.OutBack)
+        self._out_elastic = QEasingCurve(QEasingCurve.OutElastic)
+        self._out_cubic = QEasingCurve(QEasingCurve.OutCubic)
+
+        self._timer = QTimer(self)
+        self._timer.setTimerType(Qt.PreciseTimer)
+        self._timer.timeout.connect(self._tick)
+        self.set_refresh_rate(self.DEFAULT_REFRESH_RATE)
+
+    @property
+    def running(self):
+        return self._timer.isActive()
+
+    def set_refresh_rate(self, rate):
+        self._timer.setInterval(max(1, int(1000 / (rate or self.DEFAULT_REFRESH_RATE))))
+
+    def reset(self, view, size):
+        """Новое поле: все эффекты клеток сбрасываются"""
+        if self.view is not None and self._active:
+            # Прежнее представление не должно застыть на недоигранном кадре
+            self.view.set_cell_effects([divmod(index, self.size) + (None,)
+                                        for index in self._active])
+        self.view = view
+        self.size = size
+        self._kinds = bytearray(size * size)
+        self._starts = array('d', bytes(8 * size * size))
+        self._clear_colors = {}
+        self._active = set()
+        self._update_timer()
+
+    def animate_place(self, cells):
+        self._start_cells(cells, self.PLACE)
+
+    def animate_clear(self, cells, colors):
+        """colors — цвета блоков до очистки, {(row, col): color}"""
+        self._start_cells(cells, self.CLEAR)
+        for r, c in cells:
+            self._clear_colors[r * self.size + c] = colors[(r, c)]
+
+    def start_pulse(self, widget, period):
+        self._pulses[widget] = (time.perf_counter(), period / 1000)
+        self._update_timer()
+
+    def stop_pulse(self, widget):
+        if self._pulses.pop(widget, None) is not None:
+            widget.set_glow(0)
+        self._update_timer()
+
+    def _start_cells(self, cells, kind):
+        now = time.perf_counter()
+        for r, c in cells:
+            index = r * self.size + c
+            self._kinds[index] = kind
+            self._starts[index] = now
+            self._clear_colors.pop(index, None)
+            self._active.add(index)
+        self._update_timer()
+
+    def _update_timer(self):
+        if self._active or self._pulses:
+            if not self._timer.isActive():
+                self._timer.start()
+        elif self._timer.isActive():
+            self._timer.stop()
+
+    def _cell_effect(self, index, elapsed):
+        if self._kinds[index] == self.PLACE:
+            if elapsed >= self.PLACE_GLOW_DURATION:
+                return None
+            scale = self._out_back.valueForProgress(min(1.0, elapsed / self.PLACE_SCALE_DURATION))
+            rotate = self._out_elastic.valueForProgress(min(1.0, elapsed / self.PLACE_ROTATE_DURATION))
+            glow = self._out_cubic.valueForProgress(elapsed / self.PLACE_GLOW_DURATION)
+            return CellEffect(0.3 + 0.7 * scale, -180 + 180 * rotate, 1.0 - glow, 1.0, 0, None)
+
+        if elapsed >= self.CLEAR_DURATION:
+            return None
+        progress = elapsed / self.CLEAR_DURATION
+        return CellEffect(1.0 - 0.5 * progress, 0, None, 1.0 - progress,
+                          self._shake(progress), self._clear_colors[index])
+
+    def _shake(self, progress):
+        for (t0, v0), (t1, v1) in zip(self.SHAKE_KEYS, self.SHAKE_KEYS[1:]):
+            if progress < t1:
+                return v0 + (v1 - v0) * (progress - t0) / (t1 - t0)
+        return 0
+
+    def _tick(self):
+        now = time.perf_counter()
+        self.frames += 1
+
+        effects = []
+        finished = []
+        for index in self._active:
+            effect = self._cell_effect(index, now - self._starts[index])
+            if effect is None:
+                finished.append(index)
+            effects.append(divmod(index, self.size) + (effect,))
+        for index in finished:
+            self._active.discard(index)
+            self._kinds[index] = self.NONE
+            self._clear_colors.pop(index, None)
+        if effects and self.view is not None:
+            self.view.set_cell_effects(effects)
+
+        for widget, (start, period) in self._pulses.items():
+            # Свечение 0.3 → 1.0 → 0.3 за период
+            phase = ((now - start) / period) % 1.0
+            widget.set_glow(0.3 + 0.7 * (1.0 - abs(2 * phase - 1.0)))
+
+        self._update_timer()
+
+
+class FrameScheduler(QObject):
+    """Копит изменения интерфейса и применяет их разом в следующем проходе
+    цикла событий.
+
+    Сколько бы ходов и нажатий ни пришло за это время, счёт, статус, поле
+    и слоты фигур обновляются по одному разу, а клетки поля — объединением
+    всех изменившихся.
+    """
+    PARTS = ('score', 'status', 'board', 'tray')
+
+    def __init__(self, apply, parent=None):
+        """apply(dirty, cells) — dirty: множество частей из PARTS,
+        cells: изменившиеся клетки поля или None, если обновить всё поле"""
+        super().__init__(parent)
+        self._apply = apply
+        self._dirty = set()
+        self._cells = set()
+        self._all_cells = False
+        self.flushes = 0
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(0)
+        self._timer.timeout.connect(self.flush)
+
+    @property
+    def pending(self):
+        return bool(self._dirty)
+
+    def mark(self, *parts, cells=None):
+        self._dirty.update(parts)
+        if 'board' in parts:
+            if cells is None:
+                self._all_cells = True
+            else:
+                self._cells.update(cells)
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def flush(self):
+        """Применяет накопленное сейчас; без изменений ничего не делает"""
+        self._timer.stop()
+        if not self._dirty:
+            return
+        dirty = self._dirty
+        cells = None if self._all_cells else self._cells
+        self._dirty = set()
+        self._cells = set()
+        self._all_cells = False
+        self.flushes += 1
+        self._apply(dirty, cells)
+
+
+class HintSignals(QObject):
+    finished = pyqtSignal(int, object)
+
+
+class HintWorker(QRunnable):
+    """Ищет лучший ход по снимку игры в пуле потоков, не трогая виджеты"""
+    TIME_LIMIT = 1.0
+
+    def __init__(self, version, size, bits, pieces):
+        super().__init__()
+        self.version = version
+        self.size = size
+        self.bits = bits
+        self.pieces = pieces
+        self.cancelled = False
+        self.signals = HintSignals()
+
+    def cancel(self):
+        self.cancelled = True
+
+    def run(self):
+        player = SearchPlayer(time_limit=self.TIME_LIMIT, beam_width=BEAM_WIDTH)
+        result = player.search_position(self.size, self.bits, self.pieces,
+                                        should_stop=lambda: self.cancelled)
+        if self.cancelled:
+            return
+        try:
+            self.signals.finished.emit(self.version, result)
+        except RuntimeError:
+            # Приложение закрылось, пока шёл поиск, и сигналы уже удалены
+            pass
+
+
 class MainWindow(QMainWindow):
     WINDOW_WIDTH = 400
     WINDOW_HEIGHT = 700
+    BOARD_VIEWS = {
+        'grid': BlockGridView,
+        'painter': BoardView
+    }
+    DEFAULT_BOARD_VIEW = 'grid'
+    # Дольше самой длинной анимации хода: снимок упаковывается, когда она уже
+    # закончилась, а серия быстрых ходов даёт один снимок
+    AUTOSAVE_DELAY = 1000
 
     @staticmethod
     def create_dark_palette():
@@ -559,10 +972,32 @@ class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
         self.settings = Game.get_default_settings()
+        self.settings['board_view'] = self.DEFAULT_BOARD_VIEW
+        # Зерно раздачи для воспроизводимых замеров; None — каждая игра случайная
+        self.settings['seed'] = None
+        # Папка для журналов ходов (journal.py); None — игры не записываются
+        self.settings['journal_dir'] = None
+        self.journal = None
+        self.autosaver = None
+        self._autosave_timer = QTimer(self)
+        self._autosave_timer.setSingleShot(True)
+        self._autosave_timer.setInterval(self.AUTOSAVE_DELAY)
+        self._autosave_timer.timeout.connect(self._autosave)
+        self.score_writer = None
+        self.score_store = None
+        self._recorded_game = None
+        self._game_started = time.monotonic()
         self.selected_piece = None
         self.message_animation = None
         self.dragged_piece = None
-        self.dragged_piece_pos = None
+        self.thread_pool = QThreadPool.globalInstance()
+        self._board_version = 0
+        self._hint_worker = None
+        self.board_view = None
+        self.ui_scheduler = FrameScheduler(self._apply_ui_changes, self)
+        self._shown_score = None
+        self.animation_clock = AnimationClock(self)
+        self.animation_clock.set_refresh_rate(QApplication.primaryScreen().refreshRate())
         self._init_ui()
 
     def _init_ui(self):
@@ -579,9 +1014,12 @@ class MainWindow(QMainWindow):
         self._setup_game_board(layout)
         self._setup_pieces_panel(layout)
         self._setup_buttons_panel(layout)
+        self._setup_drag_overlay()
 
         self.init_game()
         self.update_game_state()
+        # Первый кадр окна должен уже показывать игру
+        self.ui_scheduler.flush()
 
     def _setup_info_panel(self, layout):
         info_panel = QFrame()
@@ -600,9 +1038,22 @@ class MainWindow(QMainWindow):
         layout.addWidget(info_panel)
 
     def _setup_game_board(self, layout):
-        self.board_grid = QGridLayout()
-        self.board_grid.setSpacing(2)
-        layout.addLayout(self.board_grid)
+        self.board_layout = QVBoxLayout()
+        self.board_layout.setContentsMargins(0, 0, 0, 0)
+        layout.addLayout(self.board_layout)
+        self._create_board_view()
+
+    def _create_board_view(self):
+        view_class = self.BOARD_VIEWS[self.settings['board_view']]
+        if isinstance(self.board_view, view_class):
+            return
+
+        if self.board_view is not None:
+            self.board_layout.removeWidget(self.board_view)
+            self.board_view.deleteLater()
+        self.board_view = view_class()
+        self.board_view.cellClicked.connect(self.board_click)
+        self.board_layout.addWidget(self.board_view)
 
     def _setup_pieces_panel(self, layout):
         pieces_panel = QFrame()
@@ -612,6 +1063,16 @@ class MainWindow(QMainWindow):
         pieces_panel.setLayout(self.pieces_layout)
         layout.addWidget(pieces_panel)
 
+        # Виджеты слотов живут всю игру, после хода меняется только фигура в них
+        self.piece_widgets = []
+        for slot in range(PIECES_PER_SET):
+            piece_widget = DraggablePieceWidget([], None)
+            piece_widget.pressed.connect(lambda slot=slot: self.select_slot(slot))
+            self.pieces_layout.addWidget(piece_widget)
+            self.piece_widgets.append(piece_widget)
+        self.tray = [None] * PIECES_PER_SET
+        self._tray_game = None
+
     def _setup_buttons_panel(self, layout):
         buttons_panel = QFrame()
         buttons_panel.setFrameShape(QFrame.StyledPanel)
@@ -619,6 +1080,7 @@ class MainWindow(QMainWindow):
 
         buttons = [
             ("Новая игра", self.new_game),
+            ("Подсказка", self.show_hint),
             ("Настройки", self.show_settings),
             ("Правила", self.show_rules),
             ("О программе", self.show_about)
@@ -632,145 +1094,318 @@ class MainWindow(QMainWindow):
         buttons_panel.setLayout(buttons_layout)
         layout.addWidget(buttons_panel)
 
-    def paintEvent(self, event):
-        super().paintEvent(event)
+    def _setup_drag_overlay(self):
+        self.drag_overlay = DragOverlay(self)
+        self.drag_overlay.setGeometry(self.rect())
+        self.drag_overlay.raise_()
 
-        if self.dragged_piece and self.dragged_piece_pos:
-            painter = QPainter(self)
-            painter.setRenderHint(QPainter.Antialiasing)
-            self.dragged_piece.paintDraggedPiece(painter, self.mapFromGlobal(self.dragged_piece_pos))
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        if hasattr(self, 'drag_overlay'):
+            self.drag_overlay.setGeometry(self.rect())
 
     def init_game(self):
         self.game = Game(
             size=self.settings['size'],
             uniform_color=self.settings['uniform_color'],
-            block_color=self.settings['block_color']
+            block_color=self.settings['block_color'],
+            engine=self.settings['engine'],
+            seed=self.settings['seed']
         )
+        self.close_journal()
+        if self.settings['journal_dir']:
+            os.makedirs(self.settings['journal_dir'], exist_ok=True)
+            name = f"{time.strftime('%Y%m%d-%H%M%S')}-{self.game.seed}.bbj"
+            self.journal = start_journal(self.game, os.path.join(self.settings['journal_dir'], name))
+        self._game_started = time.monotonic()
+        self.animation_clock.reset(self.board_view, self.game.size)
+
+    def resume_game(self, game):
+        """Продолжает уже начатую игру, например восстановленную из снимка"""
+        self.deselect_piece()
+        self.settings.update(size=game.size, uniform_color=game.uniform_color,
+                             block_color=game.block_color, engine=game.engine)
+        self._create_board_view()
+        # Журнал воспроизводится с зерна, продолженную игру в него не записать
+        self.close_journal()
+        self.game = game
+        self._game_started = time.monotonic()
+        self.animation_clock.reset(self.board_view, game.size)
+        self.update_game_state()
 
-    def update_board(self):
-        for i in reversed(range(self.board_grid.count())):
-            self.board_grid.itemAt(i).widget().setParent(None)
-
-        for row in range(self.game.size):
-            for col in range(self.game.size):
-                cell = BlockWidget(self.game.colors[row][col])
-                cell.mousePressEvent = lambda e, r=row, c=col: self.board_click(r, c)
-                self.board_grid.addWidget(cell, row, col)
-
-    def update_pieces(self):
-        for i in reversed(range(self.pieces_layout.count())):
-            self.pieces_layout.itemAt(i).widget().setParent(None)
+    def enable_autosave(self, path=AUTOSAVE_PATH):
+        self.autosaver = Autosaver(path)
 
-        for i in range(3):
-            piece = self.game.pieces[i] if i < len(self.game.pieces) else []
-            color = self.game.piece_colors[i] if i < len(self.game.piece_colors) else None
+    def resume_autosave(self):
+        """Продолжает автосохранённую игру; True, если она нашлась"""
+        try:
+            game = load_game(self.autosaver.path)
+        except OSError:
+            return False
+        except SnapshotError:
+            # Повреждённый снимок не прочитается и потом, поэтому удаляем его
+            self.autosaver.submit(None)
+            return False
+        if game.state != GameState.PLAYING:
+            return False
+        self.resume_game(game)
+        return True
 
-            piece_widget = DraggablePieceWidget(piece, color)
-            piece_widget.mousePressEvent = lambda e, idx=i: self.select_piece(idx)
+    def _autosave(self):
+        # Здесь только упаковка снимка, запись на диск идёт в потоке Autosaver
+        self._autosave_timer.stop()
+        if self.game.state == GameState.PLAYING:
+            self.autosaver.submit(pack_game(self.game))
+        else:
+            # Законченную игру продолжать нечего
+            self.autosaver.submit(None)
+
+    def close_autosave(self):
+        if self.autosaver is not None:
+            self._autosave()
+            self.autosaver.close()
+            self.autosaver = None
+
+    def enable_records(self, path=RECORDS_PATH):
+        # Пишет фоновый поток со своим соединением, читает интерфейс — в WAL они не мешают
+        self.score_writer = ScoreWriter(path)
+        self.score_store = ScoreStore(path)
+
+    def close_records(self):
+        if self.score_writer is not None:
+            self.score_writer.close()
+            self.score_store.close()
+            self.score_writer = None
+            self.score_store = None
+
+    def _record_finished_game(self):
+        """Отправляет законченную игру в базу рекордов; возвращает прежний рекорд поля"""
+        if self.score_writer is None or self._recorded_game is self.game:
+            return None
+        self._recorded_game = self.game
+        previous_best = self.score_store.best_score(self.game.size)
+        self.score_writer.submit(GameRecord(
+            self.game.score, self.game.size, self.game.moves, self.game.lines_cleared,
+            time.monotonic() - self._game_started, self.game.seed))
+        return previous_best
+
+    def close_journal(self):
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+
+    def update_board(self, changed=None):
+        self.board_view.update_cells(self.game, changed)
+
+    def _sync_tray(self):
+        """Раскладывает game.pieces по слотам панели.
+
+        Поставленная фигура освобождает свой слот, остальные остаются на
+        местах; все слоты заполняются заново только при новой раздаче.
+        Раскладка обновляется сразу после хода, а виджеты — в update_pieces.
+        """
+        pieces = list(zip(self.game.pieces, self.game.piece_colors))
+        shown = [slot for slot, entry in enumerate(self.tray) if entry]
+
+        if self._tray_game is not self.game or len(pieces) > len(shown):
+            self._tray_game = self.game
+            self.tray = [pieces[slot] if slot < len(pieces) else None
+                         for slot in range(PIECES_PER_SET)]
+            return
 
-            if i == self.selected_piece:
-                piece_widget.selected = True
+        index = 0
+        for slot in shown:
+            if index < len(pieces) and self.tray[slot] == pieces[index]:
+                index += 1
+            else:
+                self.tray[slot] = None
 
-            self.pieces_layout.addWidget(piece_widget)
+    def update_pieces(self):
+        """Переносит раскладку слотов на виджеты, трогая только изменившиеся"""
+        selected_slot = self._piece_slot(self.selected_piece)
+        for slot, widget in enumerate(self.piece_widgets):
+            piece, color = self.tray[slot] or ([], None)
+            if piece == widget.piece and color == widget.color:
+                continue
+            self.animation_clock.stop_pulse(widget)
+            widget.set_piece(piece, color)
+            # Фигуру могли выбрать раньше, чем её слот успел перерисоваться
+            if slot == selected_slot:
+                widget.set_selected(True)
+                self.animation_clock.start_pulse(widget, widget.PULSE_DURATION)
+
+    def _slot_piece_index(self, slot):
+        """Номер фигуры в game.pieces для слота, None — слот пуст"""
+        if not 0 <= slot < len(self.tray) or not self.tray[slot]:
+            return None
+        return sum(1 for entry in self.tray[:slot] if entry)
+
+    def _piece_slot(self, piece_index):
+        if piece_index is None:
+            return None
+        return [slot for slot, entry in enumerate(self.tray) if entry][piece_index]
+
+    def _piece_widget(self, piece_index):
+        return self.piece_widgets[self._piece_slot(piece_index)]
+
+    def select_slot(self, slot):
+        piece_index = self._slot_piece_index(slot)
+        if piece_index is not None:
+            self.select_piece(piece_index)
 
-    def select_piece(self, piece_index):
+    def deselect_piece(self):
         if self.selected_piece is not None:
-            prev_widget = self.pieces_layout.itemAt(self.selected_piece).widget()
+            prev_widget = self._piece_widget(self.selected_piece)
+            self.animation_clock.stop_pulse(prev_widget)
             prev_widget.set_selected(False)
+        self.selected_piece = None
+
+    def select_piece(self, piece_index):
+        self.deselect_piece()
 
         if 0 <= piece_index < len(self.game.pieces):
             self.selected_piece = piece_index
-            widget = self.pieces_layout.itemAt(piece_index).widget()
+            widget = self._piece_widget(piece_index)
             widget.set_selected(True)
+            self.animation_clock.start_pulse(widget, widget.PULSE_DURATION)
             widget.animate_hover()
 
+    def drag_piece(self, widget, global_pos):
+        """Двигает фигуру по слою перетаскивания и подсвечивает клетки,
+        которые она займёт, если отпустить её над клеткой под курсором"""
+        self.dragged_piece = widget
+        preview = []
+        fits = False
+        cell = self.board_view.cell_at(self.board_view.mapFromGlobal(global_pos))
+        if cell is not None and self.selected_piece is not None:
+            shape = self.game.pieces[self.selected_piece]
+            placement = PlacementTable.get(self.game.size, shape).at(*cell)
+            if placement is not None:
+                # Готовый индекс допустимых ходов: проверка не перебирает клетки
+                fits = self.game.can_place_piece(self.selected_piece, *cell)
+                cells = placement.cells
+            else:
+                # Фигура вылезает за край — подсвечиваем её часть на поле
+                size = self.game.size
+                cells = [(cell[0] + r, cell[1] + c)
+                         for r, shape_row in enumerate(shape)
+                         for c, filled in enumerate(shape_row)
+                         if filled and cell[0] + r < size and cell[1] + c < size]
+            origin = self.board_view.mapTo(self, QPoint(0, 0))
+            preview = [self.board_view.cell_rect(r, c).translated(origin) for r, c in cells]
+        self.drag_overlay.move_piece(widget, self.mapFromGlobal(global_pos), preview, fits)
+
+    def drop_piece(self, global_pos):
+        self.drag_overlay.clear()
+        self.handle_piece_drop(global_pos)
+        self.dragged_piece = None
+
     def handle_piece_drop(self, drop_pos):
         if not self.dragged_piece or self.selected_piece is None:
             return
 
-        # Находим виджет клетки, на которую упала фигура
-        target_widget = self.childAt(self.mapFromGlobal(drop_pos))
+        # Находим клетку, на которую упала фигура
+        cell = self.board_view.cell_at(self.board_view.mapFromGlobal(drop_pos))
 
         # Если упали не на клетку, просто сбрасываем выделение
-        if not target_widget or not isinstance(target_widget, BlockWidget):
-            self.selected_piece = None
+        if cell is None:
+            self.deselect_piece()
             return
 
-        # Находим позицию клетки в grid layout
-        index = self.board_grid.indexOf(target_widget)
-        if index == -1:
-            return
-
-        row, col, _, _ = self.board_grid.getItemPosition(index)
+        row, col = cell
 
         # Пытаемся разместить фигуру
-        if self.game.place_piece(self.selected_piece, row, col):
-            piece = self.game.pieces[self.selected_piece] if self.selected_piece < len(self.game.pieces) else []
-
-            for r in range(row, row + len(piece)):
-                for c in range(col, col + len(piece[0])):
-                    if (r < self.game.size and c < self.game.size and
-                            self.game.board[r][c] and
-                            (r - row) < len(piece) and
-                            (c - col) < len(piece[0]) and
-                            piece[r - row][c - col]):
-                        widget = self.board_grid.itemAtPosition(r, c).widget()
-                        widget.animate_place()
-
-            piece_widget = self.pieces_layout.itemAt(self.selected_piece).widget()
-            self.animate_piece_removal(piece_widget)
-
-            self.selected_piece = None
-            self.update_game_state()
+        self._place_selected_piece(row, col)
 
     def board_click(self, row, col):
         if self.selected_piece is None:
             return
 
-        if self.game.place_piece(self.selected_piece, row, col):
-            piece = self.game.pieces[self.selected_piece] if self.selected_piece < len(self.game.pieces) else []
-
-            for r in range(row, row + len(piece)):
-                for c in range(col, col + len(piece[0])):
-                    if (r < self.game.size and c < self.game.size and
-                            self.game.board[r][c] and
-                            (r - row) < len(piece) and
-                            (c - col) < len(piece[0]) and
-                            piece[r - row][c - col]):
-                        widget = self.board_grid.itemAtPosition(r, c).widget()
-                        widget.animate_place()
-
-            piece_widget = self.pieces_layout.itemAt(self.selected_piece).widget()
-            self.animate_piece_removal(piece_widget)
-
-            self.selected_piece = None
-            self.update_game_state()
-
-    def animate_piece_removal(self, widget):
-        anim = QPropertyAnimation(widget, b"scale")
-        anim.setDuration(300)
-        anim.setStartValue(1.0)
-        anim.setEndValue(0.0)
-        anim.setEasingCurve(QEasingCurve.InBack)
-        anim.start()
+        self._place_selected_piece(row, col)
+
+    def _place_selected_piece(self, row, col):
+        piece_index = self.selected_piece
+        if not self.game.can_place_piece(piece_index, row, col):
+            return
+
+        # Выделение снимаем до хода: слоты ещё показывают прежний набор,
+        # и номер фигуры указывает на её виджет
+        self.deselect_piece()
+        changed = self.game.place_piece(piece_index, row, col)
+        self.update_game_state(changed)
+
+        # Анимируем блоки новой фигуры, которые не ушли вместе с линиями,
+        # а очищенные блоки гаснут в своих прежних цветах
+        placed = self.game.last_placed
+        cleared = self.game.last_cleared
+        self.animation_clock.animate_place(placed - cleared)
+        self.animation_clock.animate_clear(cleared, self.game.last_cleared_colors)
 
     def keyPressEvent(self, event):
         if event.key() in (Qt.Key_1, Qt.Key_2, Qt.Key_3):
-            piece_index = event.key() - Qt.Key_1
-            self.select_piece(piece_index)
+            self.select_slot(event.key() - Qt.Key_1)
         else:
             super().keyPressEvent(event)
 
-    def update_game_state(self):
-        self.score_label.setText(f"Очки: {self.game.score}")
-        self.status_label.setText(GameState.get_state_name(self.game.state))
+    def show_hint(self):
+        if self.game.state != GameState.PLAYING:
+            return
 
-        self.animate_score_update()
-        self.update_board()
-        self.update_pieces()
+        self._invalidate_hint()
+        # Воркер получает только неизменяемый снимок, игра остаётся в GUI-потоке
+        self._hint_worker = HintWorker(self._board_version, self.game.size,
+                                       self.game.board_bits, tuple(self.game.pieces))
+        self._hint_worker.signals.finished.connect(self._on_hint_ready)
+        self.thread_pool.start(self._hint_worker)
 
-        if self.game.state == GameState.GAME_OVER:
-            self.show_game_over_message()
+    def _on_hint_ready(self, version, result):
+        # Поле успело измениться — подсказка устарела
+        if version != self._board_version or not result.moves:
+            return
+
+        piece_index, row, col = result.moves[0]
+        placement = PlacementTable.get(self.game.size, self.game.pieces[piece_index]).at(row, col)
+        color = self.game.piece_colors[piece_index]
+        self.board_view.show_hint(placement.cells, color)
+        self.select_piece(piece_index)
+
+    def stop_hint(self):
+        """Прерывает поиск подсказки и ждёт воркеры; вызывается при выходе"""
+        self._invalidate_hint()
+        self.thread_pool.waitForDone()
+
+    def _invalidate_hint(self):
+        self._board_version += 1
+        if self._hint_worker is not None:
+            self._hint_worker.cancel()
+            self._hint_worker = None
+        self.board_view.clear_hint()
+
+    def update_game_state(self, changed=None):
+        """Помечает интерфейс устаревшим; перерисовка — один раз за проход цикла событий"""
+        self._invalidate_hint()
+        self._sync_tray()
+        self.ui_scheduler.mark(*FrameScheduler.PARTS, cells=changed)
+        if self.autosaver is not None:
+            self._autosave_timer.start()
+
+    def _apply_ui_changes(self, dirty, cells):
+        if 'score' in dirty and self.game.score != self._shown_score:
+            self._shown_score = self.game.score
+            self.score_label.setText(f"Очки: {self.game.score}")
+            self.animate_score_update()
+
+        if 'board' in dirty:
+            self.update_board(cells)
+        if 'tray' in dirty:
+            self.update_pieces()
+
+        if 'status' in dirty:
+            self.status_label.setText(GameState.get_state_name(self.game.state))
+            if self.game.state == GameState.GAME_OVER:
+                if self.journal is not None:
+                    self.journal.flush()
+                self.show_game_over_message(self._record_finished_game())
 
     def animate_score_update(self):
         if hasattr(self, 'score_animation'):
@@ -792,10 +1427,18 @@ class MainWindow(QMainWindow):
         self.score_animation.addAnimation(scale_down)
         self.score_animation.start()
 
-    def show_game_over_message(self):
+    def show_game_over_message(self, previous_best=None):
+        text = f"Игра окончена!\nВаш результат: {self.game.score}"
+        if self.score_store is not None:
+            size = self.game.size
+            if previous_best is None or self.game.score > previous_best:
+                text += f"\nНовый рекорд поля {size}x{size}!"
+            else:
+                text += f"\nРекорд поля {size}x{size}: {previous_best}"
+
         msg_box = QMessageBox(self)
         msg_box.setWindowTitle("Конец игры")
-        msg_box.setText(f"Игра окончена!\nВаш результат: {self.game.score}")
+        msg_box.setText(text)
         msg_box.setStandardButtons(QMessageBox.Ok)
 
         msg_box.setStyleSheet("""
@@ -828,8 +1471,9 @@ class MainWindow(QMainWindow):
         self.message_animation.start()
 
     def new_game(self):
+        self.deselect_piece()
+        self._create_board_view()
         self.init_game()
-        self.selected_piece = None
         self.update_game_state()
 
     def show_settings(self):
@@ -842,6 +1486,8 @@ class MainWindow(QMainWindow):
         # Устанавливаем текущую тему в комбобокс
         current_theme = "dark" if self.palette().color(QPalette.Window).lightness() < 128 else "light"
         dialog.theme_combo.setCurrentIndex(dialog.theme_combo.findData(current_theme))
+        dialog.board_view_combo.setCurrentIndex(
+            dialog.board_view_combo.findData(self.settings['board_view']))
 
         if dialog.exec_() == QDialog.Accepted:
             self.settings['size'] = dialog.size_spin.value()
@@ -851,6 +1497,7 @@ class MainWindow(QMainWindow):
                 dialog.selected_color.green(),
                 dialog.selected_color.blue()
             )
+            self.settings['board_view'] = dialog.board_view_combo.currentData()
 
             # Применяем выбранную тему
             self.apply_theme(dialog.theme_combo.currentData())
@@ -888,6 +1535,9 @@ class MainWindow(QMainWindow):
             palette.setColor(QPalette.HighlightedText, Qt.white)
 
         self.setPalette(palette)
+        SPRITES.theme = theme_name
+        if self.board_view is not None:
+            self.board_view.update()
 
         # Обновляем стиль кнопок и других элементов
         self.style().unpolish(self)
@@ -909,6 +1559,7 @@ class MainWindow(QMainWindow):
         <ul>
             <li>Щелкните по фигуре или нажмите 1-3 для выбора</li>
             <li>Щелкните по полю или перетащите фигуру для размещения</li>
+            <li>Нажмите «Подсказка», чтобы увидеть лучший ход</li>
         </ul>
         """)
 
@@ -922,13 +1573,45 @@ class MainWindow(QMainWindow):
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Блок Бласт!")
+    parser.add_argument('--profile', nargs='?', const='trace.json', metavar='TRACE',
+                        help="замерять время кадров и обработчиков, при выходе "
+                             "записать трассировку Chrome в TRACE")
+    parser.add_argument('--journal', metavar='DIR',
+                        help="записывать ходы каждой игры в DIR (см. journal.py)")
+    parser.add_argument('--no-autosave', action='store_true',
+                        help="не сохранять игру при выходе и не продолжать сохранённую")
+    parser.add_argument('--no-records', action='store_true',
+                        help="не записывать законченные игры в базу рекордов (см. records.py)")
+    args, _ = parser.parse_known_args()
+
     app = QApplication(sys.argv)
     app.setStyle("Fusion")  # Используем Fusion стиль для лучшего отображения тем
 
     window = MainWindow()
+    resumed = False
+    if not args.no_autosave:
+        window.enable_autosave()
+        resumed = window.resume_autosave()
+        app.aboutToQuit.connect(window.close_autosave)
+    if args.journal:
+        # Журнал подключается только к новой игре: начинаем её заново,
+        # а продолженная записываться не будет
+        window.settings['journal_dir'] = args.journal
+        if not resumed:
+            window.new_game()
+    app.aboutToQuit.connect(window.close_journal)
+    app.aboutToQuit.connect(window.stop_hint)
+    if not args.no_records:
+        window.enable_records()
+        app.aboutToQuit.connect(window.close_records)
 
     # Применяем тему по умолчанию (темную)
     window.apply_theme("dark")
 
+    if args.profile:
+        from instrumentation import install_profiler
+        install_profiler(window, args.profile)
+
     window.show()
     sys.exit(app.exec_())
\ No newline at end of file
@@ -0,0 +1,241 @@
+"""Замеры производительности интерфейса «Блок Бласт!».
+
+Включается флагом: python game.py --profile trace.json
+
+Обработчики MainWindow, вызовы Game из интерфейса и тики анимации
+оборачиваются замером времени. Кадр — обработка UpdateRequest окна, в которой
+Qt вызывает paintEvent всех виджетов. Задержку цикла событий показывает
+таймер-сердцебиение. В углу окна выводятся FPS и процентили времени кадра,
+а при выходе все замеры записываются в JSON формата Chrome Trace
+(chrome://tracing, Perfetto). Без флага ничего не оборачивается и замеры
+ничего не стоят. Счётчики движка (engine.EngineStats) всех сыгранных игр
+попадают в раздел otherData трассировки.
+"""
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from functools import wraps
+
+from PyQt5.QtCore import QEvent, QObject, Qt, QTimer
+from PyQt5.QtWidgets import QApplication, QLabel, QPushButton
+
+from engine import EngineStats
+
+UI_METHODS = ('update_board', 'update_pieces', 'select_piece', 'select_slot',
+              '_place_selected_piece', 'drag_piece', 'drop_piece', 'keyPressEvent',
+              'show_hint', 'new_game', 'board_click')
+GAME_METHODS = ('place_piece', 'can_place_piece', 'legal_moves')
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class Profiler:
+    """Копит длительности именованных участков и события для трассировки"""
+    MAX_EVENTS = 200000
+    WINDOW = 600
+
+    def __init__(self, window=WINDOW):
+        self._origin = time.perf_counter()
+        self._pid = os.getpid()
+        self.events = deque(maxlen=self.MAX_EVENTS)
+        # Для процентилей храним только последние window замеров каждого участка
+        self.durations = defaultdict(lambda: deque(maxlen=window))
+        self.frames = deque(maxlen=window)
+        self.lags = deque(maxlen=window)
+        # Счётчики движка по всем играм сеанса
+        self.engine_stats = EngineStats()
+
+    def _timestamp(self, moment):
+        return (moment - self._origin) * 1e6
+
+    def record(self, name, category, start, duration):
+        self.durations[name].append(duration)
+        self.events.append({
+            'name': name, 'cat': category, 'ph': 'X',
+            'ts': self._timestamp(start), 'dur': duration * 1e6,
+            'pid': self._pid, 'tid': threading.get_ident()
+        })
+
+    @contextmanager
+    def span(self, name, category='ui'):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, category, start, time.perf_counter() - start)
+
+    def wrap(self, owner, attribute, name=None, category='ui'):
+        """Подменяет метод объекта owner такой же функцией с замером времени"""
+        method = getattr(owner, attribute)
+        name = name or f"{type(owner).__name__}.{attribute}"
+
+        @wraps(method)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.record(name, category, start, time.perf_counter() - start)
+
+        setattr(owner, attribute, timed)
+        return timed
+
+    def record_frame(self, start, duration):
+        self.record('frame', 'frame', start, duration)
+        self.frames.append((start + duration, duration))
+
+    def record_lag(self, moment, lag):
+        self.lags.append(lag)
+        self.events.append({
+            'name': 'event_loop_lag', 'ph': 'C', 'ts': self._timestamp(moment),
+            'pid': self._pid, 'args': {'lag_ms': lag * 1000}
+        })
+
+    def fps(self, period=1.0):
+        now = time.perf_counter()
+        return sum(1 for end, _ in self.frames if now - end <= period) / period
+
+    def summary(self):
+        """{участок: {'count', 'p50_ms', 'p99_ms'}} по последним замерам"""
+        return {name: {'count': len(values),
+                       'p50_ms': percentile(values, 0.5) * 1000,
+                       'p99_ms': percentile(values, 0.99) * 1000}
+                for name, values in self.durations.items()}
+
+    def export_chrome_trace(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': list(self.events), 'displayTimeUnit': 'ms',
+                       'otherData': {'engine_stats': self.engine_stats.as_dict()}}, f)
+
+
+class LagMonitor(QObject):
+    """Сердцебиение: насколько позже срока сработал таймер — настолько
+    цикл событий был занят"""
+    INTERVAL = 50
+
+    def __init__(self, profiler, parent=None):
+        super().__init__(parent)
+        self.profiler = profiler
+        self._timer = QTimer(self)
+        self._timer.setTimerType(Qt.PreciseTimer)
+        self._timer.timeout.connect(self._beat)
+        self._expected = time.perf_counter() + self.INTERVAL / 1000
+        self._timer.start(self.INTERVAL)
+
+    def _beat(self):
+        now = time.perf_counter()
+        self.profiler.record_lag(now, max(0.0, now - self._expected))
+        self._expected = now + self.INTERVAL / 1000
+
+
+class FrameTimer(QObject):
+    """Фильтр событий окна: обрабатывает UpdateRequest сам и замеряет его.
+
+    В этой обработке Qt вызывает paintEvent всех грязных виджетов окна,
+    поэтому её длительность и есть время кадра.
+    """
+    def __init__(self, profiler, window):
+        super().__init__(window)
+        self.profiler = profiler
+        window.installEventFilter(self)
+
+    def eventFilter(self, obj, event):
+        if event.type() != QEvent.UpdateRequest:
+            return False
+        start = time.perf_counter()
+        type(obj).event(obj, event)
+        self.profiler.record_frame(start, time.perf_counter() - start)
+        return True
+
+
+class StatsOverlay(QLabel):
+    """Строка с FPS, временем кадра и задержкой цикла событий в углу окна"""
+    REFRESH_INTERVAL = 500
+
+    def __init__(self, profiler, parent=None):
+        super().__init__(parent)
+        self.profiler = profiler
+        self.setAttribute(Qt.WA_TransparentForMouseEvents)
+        self.setStyleSheet("background-color: rgba(0, 0, 0, 160); color: #7f7;"
+                           "font-family: monospace; font-size: 10px; padding: 2px;")
+        self.move(4, 4)
+
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self.refresh)
+        self._timer.start(self.REFRESH_INTERVAL)
+        self.refresh()
+
+    def refresh(self):
+        frames = [duration for _, duration in self.profiler.frames]
+        lags = list(self.profiler.lags)
+        self.setText(f"FPS {self.profiler.fps():.0f}  "
+                     f"кадр p50 {percentile(frames, 0.5) * 1000:.1f} "
+                     f"p99 {percentile(frames, 0.99) * 1000:.1f} мс  "
+                     f"лаг p99 {percentile(lags, 0.99) * 1000:.1f} мс")
+        self.adjustSize()
+        self.raise_()
+
+
+def _instrument_game(profiler, game):
+    game.enable_stats(profiler.engine_stats, timing=True)
+    for attribute in GAME_METHODS:
+        profiler.wrap(game, attribute, f"Game.{attribute}", 'engine')
+
+
+def _reconnect(signal, old_slot, new_slot):
+    """Переключает signal с old_slot на new_slot; False, если old_slot не был подключён"""
+    try:
+        signal.disconnect(old_slot)
+    except TypeError:
+        return False
+    signal.connect(new_slot)
+    return True
+
+
+def install_profiler(window, trace_path=None):
+    """Включает замеры для MainWindow; trace_path — куда записать трассировку при выходе"""
+    profiler = Profiler()
+
+    # Кнопки и поле подключены к методам до обёртки, поэтому сигналы переподключаем
+    bound = {attribute: getattr(window, attribute) for attribute in UI_METHODS}
+    for attribute in UI_METHODS:
+        profiler.wrap(window, attribute, f"MainWindow.{attribute}")
+    for button in window.findChildren(QPushButton):
+        for attribute in ('new_game', 'show_hint'):
+            # clicked передаёт checked, а обработчики его не принимают
+            _reconnect(button.clicked, bound[attribute],
+                       lambda checked=False, a=attribute: getattr(window, a)())
+    _reconnect(window.board_view.cellClicked, bound['board_click'], window.board_click)
+    profiler.wrap(window.ui_scheduler, '_apply', 'MainWindow._apply_ui_changes')
+
+    # Таймер часов анимации связан с методом заранее, поэтому переподключаем
+    clock = window.animation_clock
+    tick = clock._tick
+    _reconnect(clock._timer.timeout, tick, profiler.wrap(clock, '_tick', 'AnimationClock.tick', 'animation'))
+
+    # Каждая новая игра тоже должна попадать в замеры
+    _instrument_game(profiler, window.game)
+    init_game = window.init_game
+
+    def instrumented_init_game():
+        init_game()
+        _instrument_game(profiler, window.game)
+    window.init_game = instrumented_init_game
+
+    window.frame_timer = FrameTimer(profiler, window)
+    window.lag_monitor = LagMonitor(profiler, window)
+    window.stats_overlay = StatsOverlay(profiler, window)
+    window.stats_overlay.show()
+    if trace_path:
+        QApplication.instance().aboutToQuit.connect(
+            lambda: profiler.export_chrome_trace(trace_path))
+    window.profiler = profiler
+    return profiler
@@ -0,0 +1,240 @@
+"""Двоичный журнал ходов «Блок Бласт!» и его быстрый проигрыватель.
+
+Игра полностью определяется зерном и ходами, поэтому журнал хранит только
+заголовок (зерно, размер поля, настройки) и записи фиксированной длины
+(слот фигуры, строка, столбец) — по три байта на ход. Файл только
+дописывается через буфер; оборванная при сбое последняя запись
+при чтении отбрасывается.
+
+Проигрыватель перематывает игру на масках полей, без индекса допустимых
+ходов и без PyQt5, а полная Game собирается только для нужного хода.
+
+Пример:
+    python journal.py games/*.bbj --moves 10
+"""
+import argparse
+import struct
+import sys
+import time
+from collections import namedtuple
+
+from engine import ENGINE_CODES, Dealer, Game, LineMasks, PlacementTable, apply_placement, move_score
+
+MAGIC = b'BBJ\x1a'
+VERSION = 1
+BUFFER_SIZE = 64 * 1024
+# Слот фигуры 255 — не ход, а Game.reset_game()
+RESET_SLOT = 0xFF
+
+# Заголовок: метка, версия, размер поля, одинаковый цвет, цвет блоков (RGB),
+# движок поля и зерно
+HEADER = struct.Struct('<4sBHB3BBQ')
+RECORD = struct.Struct('<3B')
+
+JournalHeader = namedtuple('JournalHeader', ['size', 'uniform_color', 'block_color', 'engine', 'seed'])
+
+
+class JournalError(ValueError):
+    pass
+
+
+def header_for(game):
+    if game.seed is None or not 0 <= game.seed < 1 << 64:
+        raise JournalError("Журнал требует зерно игры от 0 до 2**64 - 1")
+    if game.size > 255:
+        raise JournalError("Журнал поддерживает поля до 255 клеток в стороне")
+    return JournalHeader(game.size, game.uniform_color, tuple(game.block_color),
+                         game.engine, game.seed)
+
+
+class JournalWriter:
+    """Пишет журнал одной игры; подключается к ней через Game.attach_journal"""
+
+    def __init__(self, target, header):
+        # target — путь или открытый двоичный файл
+        if hasattr(target, 'write'):
+            self._file = target
+            self._owns_file = False
+        else:
+            self._file = open(target, 'wb', buffering=BUFFER_SIZE)
+            self._owns_file = True
+        self.header = header
+        self.records = 0
+        self._file.write(HEADER.pack(MAGIC, VERSION, header.size, int(header.uniform_color),
+                                     *header.block_color, ENGINE_CODES.index(header.engine),
+                                     header.seed))
+
+    def record(self, slot, row, col):
+        self._file.write(RECORD.pack(slot, row, col))
+        self.records += 1
+
+    def record_reset(self):
+        self.record(RESET_SLOT, 0, 0)
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        if self._owns_file:
+            self._file.close()
+        else:
+            self._file.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def start_journal(game, target):
+    """Открывает журнал для новой игры и подключает его к ней"""
+    writer = JournalWriter(target, header_for(game))
+    game.attach_journal(writer)
+    return writer
+
+
+def parse_journal(data):
+    """Разбирает содержимое журнала: (JournalHeader, записи подряд в bytes)"""
+    if len(data) < HEADER.size:
+        raise JournalError("Журнал короче заголовка")
+    magic, version, size, uniform_color, r, g, b, engine, seed = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise JournalError("Это не журнал «Блок Бласт!»")
+    if version != VERSION:
+        raise JournalError(f"Неизвестная версия журнала: {version}")
+    if engine >= len(ENGINE_CODES):
+        raise JournalError(f"Неизвестный движок поля: {engine}")
+    header = JournalHeader(size, bool(uniform_color), (r, g, b), ENGINE_CODES[engine], seed)
+    body = data[HEADER.size:]
+    return header, bytes(body[:len(body) - len(body) % RECORD.size])
+
+
+def read_journal(path):
+    with open(path, 'rb') as f:
+        return parse_journal(f.read())
+
+
+class Replayer:
+    """Перематывает игру из журнала до любого хода.
+
+    Пока идёт перемотка, состояние — маска поля, цвета, счёт и текущий набор;
+    каждый ход проверяется только на попадание в поле и свободные клетки.
+    """
+
+    def __init__(self, header, records):
+        self.header = header
+        self._records = records
+        self._masks = LineMasks.get(header.size)
+        self._dealer = Dealer(header.uniform_color, header.block_color, seed=header.seed)
+        self._reset()
+        self._deal()
+        self.position = 0
+
+    @classmethod
+    def open(cls, path):
+        return cls(*read_journal(path))
+
+    @classmethod
+    def from_bytes(cls, data):
+        return cls(*parse_journal(data))
+
+    def __len__(self):
+        return len(self._records) // RECORD.size
+
+    def _reset(self):
+        size = self.header.size
+        self.bits = 0
+        self.colors = [[None] * size for _ in range(size)]
+        self.score = 0
+        self.moves = 0
+        self.lines_cleared = 0
+
+    def _deal(self):
+        orientations, self.piece_colors = self._dealer.deal()
+        self.pieces = [orientation.shape for orientation in orientations]
+        self._tables = [PlacementTable.get(self.header.size, shape) for shape in self.pieces]
+
+    def fast_forward(self, count=None):
+        """Проигрывает записи до номера count (None — до конца журнала)"""
+        total = len(self)
+        count = total if count is None else min(count, total)
+        if count < self.position:
+            raise JournalError("Перемотка назад не поддерживается, откройте журнал заново")
+
+        size = self.header.size
+        masks = self._masks
+        records = self._records
+        for index in range(self.position, count):
+            slot, row, col = records[index * 3], records[index * 3 + 1], records[index * 3 + 2]
+            if slot == RESET_SLOT:
+                self._reset()
+                self._deal()
+                continue
+
+            table = self._tables[slot] if slot < len(self._tables) else None
+            placement = table.at(row, col) if table is not None else None
+            if placement is None or self.bits & placement.mask:
+                raise JournalError(f"Запись {index}: ход ({slot}, {row}, {col}) невозможен")
+
+            self.bits, full_rows, full_cols = apply_placement(self.bits, placement, masks)
+            colors = self.colors
+            color = self.piece_colors[slot]
+            for r, c in placement.cells:
+                colors[r][c] = color
+            for r in full_rows:
+                colors[r] = [None] * size
+            for c in full_cols:
+                for colors_row in colors:
+                    colors_row[c] = None
+
+            lines = len(full_rows) + len(full_cols)
+            self.score += move_score(table.blocks, lines, size)
+            self.moves += 1
+            self.lines_cleared += lines
+
+            del self.pieces[slot]
+            del self.piece_colors[slot]
+            del self._tables[slot]
+            if not self._tables:
+                self._deal()
+        self.position = count
+        return self
+
+    def game(self):
+        """Собирает полноценную Game в текущей позиции перемотки"""
+        header = self.header
+        game = Game(size=header.size, uniform_color=header.uniform_color,
+                    block_color=header.block_color, engine=header.engine, seed=header.seed)
+        game.set_rng_state(self._dealer.get_state())
+        game.restore(self.bits, self.colors, self.pieces, self.piece_colors,
+                     self.score, self.moves, self.lines_cleared)
+        return game
+
+
+def game_at(path, count=None):
+    """Game из журнала path после count записей (None — в конце журнала)"""
+    return Replayer.open(path).fast_forward(count).game()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Проигрывание журналов «Блок Бласт!»")
+    parser.add_argument('journals', nargs='+')
+    parser.add_argument('--moves', type=int, default=None,
+                        help="остановиться после стольких записей (по умолчанию — в конце)")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    for path in args.journals:
+        replayer = Replayer.open(path).fast_forward(args.moves)
+        header = replayer.header
+        print(f"{path}: зерно {header.seed}, поле {header.size}, "
+              f"запись {replayer.position} из {len(replayer)}, "
+              f"счёт {replayer.score}, ходов {replayer.moves}, линий {replayer.lines_cleared}")
+    elapsed = time.perf_counter() - start
+    print(f"Журналов: {len(args.journals)}, "
+          f"{len(args.journals) / elapsed if elapsed else 0:.0f} в секунду", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
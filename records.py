@@ -0,0 +1,202 @@
+"""Рекорды и статистика сыгранных игр «Блок Бласт!» в SQLite.
+
+База работает в режиме WAL: интерфейс читает таблицу рекордов, пока
+фоновый поток дописывает новые игры. Записи копятся и фиксируются пачками
+в одной транзакции. Единственный индекс (размер поля, счёт по убыванию, ...)
+отдаёт лучшие игры поля без сортировки и покрывает все столбцы
+агрегатов, поэтому статистика по размеру не читает саму таблицу.
+Модуль использует только стандартную библиотеку.
+
+Пример:
+    python records.py --size 10 --top 5
+"""
+import argparse
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+RECORDS_PATH = os.path.join(os.path.expanduser('~'), '.block_blast', 'records.sqlite3')
+
+GameRecord = namedtuple('GameRecord', ['score', 'size', 'moves', 'lines_cleared', 'duration',
+                                       'seed', 'source', 'finished_at'],
+                        defaults=(None, None, 'gui', None))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    id INTEGER PRIMARY KEY,
+    finished_at REAL NOT NULL,
+    size INTEGER NOT NULL,
+    score INTEGER NOT NULL,
+    moves INTEGER NOT NULL,
+    lines_cleared INTEGER NOT NULL,
+    duration REAL,
+    -- Зерно может не поместиться в 64-битное целое SQLite, поэтому текстом
+    seed TEXT,
+    source TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS games_by_size_score
+    ON games (size, score DESC, moves, lines_cleared, duration);
+"""
+
+INSERT = ("INSERT INTO games (finished_at, size, score, moves, lines_cleared, duration, seed, source) "
+          "VALUES (?, ?, ?, ?, ?, ?, ?, ?)")
+
+
+def _row(record):
+    return (record.finished_at if record.finished_at is not None else time.time(),
+            record.size, record.score, record.moves, record.lines_cleared, record.duration,
+            None if record.seed is None else str(record.seed), record.source)
+
+
+class ScoreStore:
+    """Соединение с базой рекордов; у каждого потока должно быть своё"""
+
+    def __init__(self, path=RECORDS_PATH):
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._connection = sqlite3.connect(path, timeout=10)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        # В WAL это не теряет целостность при сбое, только последние транзакции
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript(SCHEMA)
+
+    def add_many(self, records):
+        """Записывает игры одной транзакцией; возвращает их число"""
+        rows = [_row(record) for record in records]
+        with self._connection:
+            self._connection.executemany(INSERT, rows)
+        return len(rows)
+
+    def add(self, record):
+        self.add_many([record])
+
+    def top(self, size, limit=10):
+        """Лучшие игры на поле size по убыванию счёта"""
+        cursor = self._connection.execute(
+            "SELECT score, size, moves, lines_cleared, duration, seed, source, finished_at "
+            "FROM games WHERE size = ? ORDER BY score DESC LIMIT ?", (size, limit))
+        return [GameRecord(*row[:5], int(row[5]) if row[5] is not None else None, *row[6:])
+                for row in cursor]
+
+    def best_score(self, size):
+        row = self._connection.execute(
+            "SELECT MAX(score) FROM games WHERE size = ?", (size,)).fetchone()
+        return row[0]
+
+    def stats(self, size=None):
+        """{размер: {'games', 'best', 'average_score', 'average_moves',
+        'lines_cleared', 'total_duration'}} — по всем размерам или по одному"""
+        query = ("SELECT size, COUNT(*), MAX(score), AVG(score), AVG(moves), "
+                 "SUM(lines_cleared), SUM(duration) FROM games")
+        params = ()
+        if size is not None:
+            query += " WHERE size = ?"
+            params = (size,)
+        query += " GROUP BY size ORDER BY size"
+        return {row[0]: {'games': row[1], 'best': row[2], 'average_score': row[3],
+                         'average_moves': row[4], 'lines_cleared': row[5],
+                         'total_duration': row[6] or 0.0}
+                for row in self._connection.execute(query, params)}
+
+    def count(self):
+        return self._connection.execute("SELECT COUNT(*) FROM games").fetchone()[0]
+
+    def close(self):
+        self._connection.close()
+
+
+_FLUSH = object()
+_STOP = object()
+
+
+class ScoreWriter:
+    """Пишет игры в базу из фонового потока пачками.
+
+    submit() только кладёт запись в очередь. Поток ждёт первую запись,
+    забирает всё, что успело накопиться (не больше BATCH_SIZE), и фиксирует
+    одной транзакцией; одиночная запись ждёт не дольше FLUSH_INTERVAL.
+    """
+    BATCH_SIZE = 500
+    FLUSH_INTERVAL = 0.5
+
+    def __init__(self, path=RECORDS_PATH):
+        self.path = path
+        self.written = 0
+        self.batches = 0
+        self.error = None
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='records', daemon=True)
+        self._thread.start()
+
+    def submit(self, record):
+        self._queue.put(record)
+
+    def flush(self):
+        """Дожидается, пока всё отправленное окажется в базе"""
+        done = threading.Event()
+        self._queue.put((_FLUSH, done))
+        done.wait()
+
+    def close(self):
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def _run(self):
+        # Соединение SQLite привязано к потоку, который его открыл
+        store = ScoreStore(self.path)
+        try:
+            while True:
+                batch = []
+                signals = []
+                item = self._queue.get()
+                deadline = time.monotonic() + self.FLUSH_INTERVAL
+                while True:
+                    if item is _STOP or isinstance(item, tuple) and item[0] is _FLUSH:
+                        signals.append(item)
+                        break
+                    batch.append(item)
+                    if len(batch) >= self.BATCH_SIZE:
+                        break
+                    try:
+                        item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                    except queue.Empty:
+                        break
+
+                if batch:
+                    try:
+                        self.written += store.add_many(batch)
+                        self.batches += 1
+                    except sqlite3.Error as error:
+                        # Рекорды не должны ронять игру; ошибка остаётся для отладки
+                        self.error = error
+                for signal in signals:
+                    if signal is _STOP:
+                        return
+                    signal[1].set()
+        finally:
+            store.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Рекорды «Блок Бласт!»")
+    parser.add_argument('--db', default=RECORDS_PATH)
+    parser.add_argument('--size', type=int, default=None, help="только это поле")
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args(argv)
+
+    store = ScoreStore(args.db)
+    for size, stats in store.stats(args.size).items():
+        print(f"Поле {size}x{size}: игр {stats['games']}, рекорд {stats['best']}, "
+              f"средний счёт {stats['average_score']:.1f}, в среднем ходов {stats['average_moves']:.1f}")
+        for place, record in enumerate(store.top(size, args.top), 1):
+            print(f"  {place:3d}. {record.score:7d}  ходов {record.moves}, линий {record.lines_cleared}, "
+                  f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(record.finished_at))}, {record.source}")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
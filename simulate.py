@@ -0,0 +1,281 @@
+"""Пакетная симуляция игр «Блок Бласт!» на всех ядрах процессора.
+
+Игры раздаются пулу процессов пачками, результаты приходят по мере готовности.
+Каждая игра полностью определяется своим зерном, поэтому повторный запуск
+с теми же зёрнами даёт те же очки и ходы.
+
+Пример:
+    python simulate.py --strategy random --seed 0 --games 10000 --size 10
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from ai import search_strategy
+from engine import EngineStats, Game, GameState, LineMasks, PlacementTable, apply_placement, move_score
+from records import GameRecord, ScoreStore
+
+# stats — счётчики EngineStats.as_dict() игры, если их просили собрать
+GameResult = namedtuple('GameResult', ['seed', 'score', 'moves', 'lines_cleared', 'duration', 'stats'],
+                        defaults=(None,))
+
+
+def first_move_strategy(game, rng):
+    """Ставит первую фигуру, которую можно поставить, в первую свободную позицию"""
+    for piece_index in range(len(game.pieces)):
+        moves = game.legal_moves(piece_index)
+        if moves:
+            return (piece_index,) + moves[0]
+    return None
+
+
+def random_strategy(game, rng):
+    """Выбирает случайный ход среди всех допустимых"""
+    moves = [(piece_index, row, col)
+             for piece_index in range(len(game.pieces))
+             for row, col in game.legal_moves(piece_index)]
+    return rng.choice(moves) if moves else None
+
+
+RECORD_BATCH = 5000
+
+# Стратегии, которые умеет пакетный движок (BatchGame.run)
+LOCKSTEP_STRATEGIES = ('first', 'random')
+
+STRATEGIES = {
+    'first': first_move_strategy,
+    'random': random_strategy,
+    'search': search_strategy
+}
+
+
+def resolve_strategy(strategy):
+    # Стратегию передаём в процессы по имени, а функции модульного уровня — как есть
+    if callable(strategy):
+        return strategy
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Неизвестная стратегия: {strategy}")
+    return STRATEGIES[strategy]
+
+
+def play_game(strategy, seed, size, stats=False):
+    strategy = resolve_strategy(strategy)
+    # У стратегии свой генератор, чтобы её выбор не сбивал раздачу фигур
+    rng = random.Random(seed)
+
+    start = time.perf_counter()
+    game = Game(size=size, seed=seed)
+    engine_stats = game.enable_stats(timing=True) if stats else None
+    while game.state == GameState.PLAYING:
+        move = strategy(game, rng)
+        # Игра кончается только без допустимых ходов; иначе это ошибка стратегии
+        if move is None or not game.place_piece(*move):
+            raise ValueError(f"Стратегия {strategy.__name__}, зерно {seed}, ход {game.moves + 1}: "
+                             f"недопустимый ход {move}")
+    duration = time.perf_counter() - start
+
+    return GameResult(seed, game.score, game.moves, game.lines_cleared, duration,
+                      engine_stats.as_dict() if engine_stats else None)
+
+
+def _play_chunk(strategy, seeds, size, stats=False):
+    return [play_game(strategy, seed, size, stats) for seed in seeds]
+
+
+def run_batch(strategy, seed=0, games=1000, size=10, workers=None, chunk_size=None, stats=False):
+    """Играет games игр с зёрнами seed, seed + 1, ... и отдаёт GameResult по мере готовности.
+
+    stats=True — собрать счётчики движка каждой игры (см. engine.EngineStats)
+    """
+    resolve_strategy(strategy)
+    workers = workers or os.cpu_count() or 1
+    # Мелкие пачки равномерно загружают процессы, крупные — снижают накладные расходы
+    chunk_size = chunk_size or max(1, min(256, games // (workers * 8)))
+    seeds = range(seed, seed + games)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_play_chunk, strategy, seeds[i:i + chunk_size], size, stats)
+                   for i in range(0, games, chunk_size)]
+        for future in as_completed(futures):
+            yield from future.result()
+
+
+def run_lockstep(strategy, seed=0, games=1000, size=10):
+    """Играет все игры одновременно на пакетном движке NumPy (см. batch_engine.py)"""
+    from batch_engine import BatchGame
+
+    batch = BatchGame(range(seed, seed + games), size).run(strategy)
+    # Игры идут в ногу, поэтому длительность отдельной игры не измеряется
+    for index, game_seed in enumerate(batch.seeds):
+        yield GameResult(game_seed, int(batch.scores[index]), int(batch.moves[index]),
+                         int(batch.lines_cleared[index]), None)
+
+
+def verify_lockstep(strategy, seed=0, games=200, size=10, workers=None):
+    """Сравнивает пакетный движок с Game на одних и тех же зёрнах.
+
+    Возвращает список расхождений [(зерно, результат Game, результат пакетного движка)],
+    сравниваются счёт, число ходов и очищенных линий.
+    """
+    def outcome(result):
+        return result.score, result.moves, result.lines_cleared
+
+    expected = {result.seed: outcome(result)
+                for result in run_batch(strategy, seed, games, size, workers)}
+    return [(result.seed, expected.get(result.seed), outcome(result))
+            for result in run_lockstep(strategy, seed, games, size)
+            if expected.get(result.seed) != outcome(result)]
+
+
+def _naive_fits(board, shape, row, col):
+    # Исходное правило: каждая клетка фигуры внутри поля и свободна
+    size = len(board)
+    return all(0 <= row + r < size and 0 <= col + c < size and not board[row + r][col + c]
+               for r, line in enumerate(shape) for c, filled in enumerate(line) if filled)
+
+
+def _rules_mismatch(game):
+    """Сверяет позицию game с наивным перебором клеток; описание расхождения или None"""
+    board = game.board
+    size = game.size
+    if game._row_fill != [sum(line) for line in board]:
+        return f"_row_fill {game._row_fill}"
+    if game._col_fill != [sum(line[c] for line in board) for c in range(size)]:
+        return f"_col_fill {game._col_fill}"
+
+    can_move = False
+    # Якоря за краем поля и несуществующий слот тоже проверяются
+    for piece_index in range(len(game.pieces) + 1):
+        shape = game.pieces[piece_index] if piece_index < len(game.pieces) else None
+        for row in range(-1, size + 1):
+            for col in range(-1, size + 1):
+                expected = shape is not None and _naive_fits(board, shape, row, col)
+                if game.can_place_piece(piece_index, row, col) != expected:
+                    return f"can_place_piece({piece_index}, {row}, {col}) != {expected}"
+                can_move = can_move or expected
+    if (game.state == GameState.PLAYING) != can_move:
+        return f"состояние {game.state.name}, а ход {'есть' if can_move else 'не найден'}"
+    return None
+
+
+def _move_mismatch(game, rng, masks):
+    """Делает случайный ход и сверяет поле и очки с apply_placement и move_score"""
+    piece_index, row, col = random_strategy(game, rng)
+    table = PlacementTable.get(game.size, game.pieces[piece_index])
+    bits, rows, cols = apply_placement(game.board_bits, table.at(row, col), masks)
+    score = game.score + move_score(table.blocks, len(rows) + len(cols), game.size)
+    game.place_piece(piece_index, row, col)
+    if (game.board_bits, game.score) != (bits, score):
+        return f"ход {(piece_index, row, col)} расходится с apply_placement"
+    return None
+
+
+def verify_rules(seed=0, games=300, size=10):
+    """Играет случайные игры на каждом движке поля и сверяет Game с исходными правилами.
+
+    Каждая позиция сравнивается с наивным перебором клеток (can_place_piece,
+    конец игры, счётчики заполнения линий), каждый ход — с engine.apply_placement
+    и move_score. Возвращает список расхождений [(движок, зерно, ход, описание)].
+    """
+    masks = LineMasks.get(size)
+    mismatches = []
+    for engine in sorted(Game.ENGINES):
+        for game_seed in range(seed, seed + games):
+            game = Game(size=size, seed=game_seed, engine=engine)
+            rng = random.Random(game_seed)
+            problem = _rules_mismatch(game)
+            while problem is None and game.state == GameState.PLAYING:
+                problem = _move_mismatch(game, rng, masks) or _rules_mismatch(game)
+            if problem is not None:
+                mismatches.append((engine, game_seed, game.moves, problem))
+    return mismatches
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Пакетная симуляция игр «Блок Бласт!»")
+    parser.add_argument('--strategy', default='random', choices=sorted(STRATEGIES))
+    parser.add_argument('--seed', type=int, default=0, help="первое зерно диапазона")
+    parser.add_argument('--games', type=int, default=1000)
+    parser.add_argument('--size', type=int, default=Game.get_default_settings()['size'])
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--lockstep', action='store_true',
+                        help="играть все игры разом на пакетном движке NumPy")
+    parser.add_argument('--summary-only', action='store_true',
+                        help="не выводить результат каждой игры")
+    parser.add_argument('--stats', action='store_true',
+                        help="собрать счётчики движка: в каждой строке и суммой в конце")
+    parser.add_argument('--record', metavar='DB',
+                        help="дописать результаты в базу рекордов SQLite (см. records.py)")
+    parser.add_argument('--verify', action='store_true',
+                        help="сыграть игры на Game и на пакетном движке и сравнить результаты")
+    parser.add_argument('--verify-rules', action='store_true',
+                        help="сверить Game на каждом движке поля с наивным перебором клеток")
+    args = parser.parse_args(argv)
+    if args.lockstep and args.stats:
+        parser.error("--stats не поддерживается пакетным движком (--lockstep)")
+    if (args.lockstep or args.verify) and args.strategy not in LOCKSTEP_STRATEGIES:
+        parser.error(f"пакетный движок (--lockstep, --verify) поддерживает только стратегии "
+                     f"{', '.join(LOCKSTEP_STRATEGIES)}")
+
+    if args.verify_rules:
+        mismatches = verify_rules(args.seed, args.games, args.size)
+        for engine, game_seed, moves, problem in mismatches:
+            print(f"Движок {engine}, зерно {game_seed}, ход {moves}: {problem}", file=sys.stderr)
+        print(f"Проверено игр: {args.games} на каждом движке, расхождений: {len(mismatches)}",
+              file=sys.stderr)
+        return 1 if mismatches else 0
+
+    if args.verify:
+        mismatches = verify_lockstep(args.strategy, args.seed, args.games, args.size, args.workers)
+        for game_seed, expected, actual in mismatches:
+            print(f"Зерно {game_seed}: Game {expected}, пакетный движок {actual}", file=sys.stderr)
+        print(f"Проверено игр: {args.games}, расхождений: {len(mismatches)}", file=sys.stderr)
+        return 1 if mismatches else 0
+
+    start = time.perf_counter()
+    played = 0
+    total_score = 0
+    total_stats = EngineStats() if args.stats else None
+    store = ScoreStore(args.record) if args.record else None
+    pending = []
+    if args.lockstep:
+        results = run_lockstep(args.strategy, args.seed, args.games, args.size)
+    else:
+        results = run_batch(args.strategy, args.seed, args.games, args.size, args.workers,
+                            stats=args.stats)
+    for result in results:
+        played += 1
+        total_score += result.score
+        if total_stats is not None:
+            total_stats.add(result.stats)
+        if store is not None:
+            pending.append(GameRecord(result.score, args.size, result.moves, result.lines_cleared,
+                                      result.duration, result.seed, f"simulate:{args.strategy}"))
+            # Пачками по RECORD_BATCH игр: одна транзакция на пачку
+            if len(pending) >= RECORD_BATCH:
+                store.add_many(pending)
+                pending = []
+        if not args.summary_only:
+            row = result._asdict()
+            if row['stats'] is None:
+                del row['stats']
+            print(json.dumps(row))
+    if store is not None:
+        store.add_many(pending)
+        store.close()
+    elapsed = time.perf_counter() - start
+
+    print(f"Игр: {played}, время: {elapsed:.2f} с, "
+          f"{played / elapsed if elapsed else 0:.1f} игр/с, "
+          f"средний счёт: {total_score / played if played else 0:.1f}", file=sys.stderr)
+    if total_stats is not None:
+        print(json.dumps({'engine_stats': total_stats.as_dict()}), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,235 @@
+"""Компактный снимок партии «Блок Бласт!» и автосохранение в фоне.
+
+Снимок — поле одной битовой маской, цвета блоков номерами в палитре,
+текущий набор фигур номерами ориентаций из каталога, счёт и состояние
+генератора раздачи. Из снимка собирается Game, которая продолжает ту же
+раздачу, что и исходная. Файл заменяется атомарно: снимок пишется во
+временный файл рядом и переименовывается поверх старого.
+Модуль зависит только от engine.py и работает без PyQt5.
+"""
+import os
+import random
+import struct
+import threading
+from array import array
+
+from engine import ENGINE_CODES, Game, ORIENTATIONS, PIECES_PER_SET
+
+MAGIC = b'BBS\x1a'
+VERSION = 1
+# Число наборов и сторона поля ограничены, чтобы испорченный заголовок
+# не заставлял перебирать миллиарды клеток
+MAX_SIZE = 255
+MAX_QUEUED = 255
+
+# Заголовок: метка, версия, размер поля, одинаковый цвет, цвет блоков (RGB),
+# движок поля, есть ли зерно, зерно, счёт, ходы и очищенные линии
+HEADER = struct.Struct('<4sBHB3BBBQQII')
+PALETTE_HEADER = struct.Struct('<HB')
+PIECE = struct.Struct('<HH')
+# Состояние random.Random: версия, 624 слова вихря Мерсенна и позиция в них,
+# затем отложенное значение gauss, если оно есть
+RNG_STATE = struct.Struct('<B625IBd')
+
+ORIENTATION_IDS = {orientation.shape: orientation.id for orientation in ORIENTATIONS}
+
+
+class SnapshotError(ValueError):
+    pass
+
+
+class _Palette:
+    def __init__(self):
+        self.colors = []
+        self._index = {}
+
+    def index(self, color):
+        color = tuple(color)
+        index = self._index.get(color)
+        if index is None:
+            index = self._index[color] = len(self.colors)
+            self.colors.append(color)
+        return index
+
+
+def _pack_pieces(shapes, colors, palette):
+    return b''.join(PIECE.pack(ORIENTATION_IDS[tuple(map(tuple, shape))], palette.index(color))
+                    for shape, color in zip(shapes, colors))
+
+
+def _unpack_pieces(data, offset, count, palette):
+    orientations = []
+    colors = []
+    for _ in range(count):
+        orientation_id, color_index = PIECE.unpack_from(data, offset)
+        offset += PIECE.size
+        orientations.append(ORIENTATIONS[orientation_id])
+        colors.append(palette[color_index])
+    return orientations, colors, offset
+
+
+def pack_game(game):
+    """Снимок игры в bytes"""
+    size = game.size
+    if size > MAX_SIZE:
+        raise SnapshotError(f"Снимок поддерживает поля до {MAX_SIZE} клеток в стороне")
+    bits = game.board_bits
+    palette = _Palette()
+
+    # Цвета храним только для занятых клеток, в порядке их битов
+    colors = game.colors
+    cell_colors = [palette.index(colors[index // size][index % size])
+                   for index in range(size * size) if bits >> index & 1]
+    pieces = _pack_pieces(game.pieces, game.piece_colors, palette)
+    rng_state, queue = game.get_rng_state()
+    if len(queue) > MAX_QUEUED:
+        # Отбросить наборы нельзя: генератор уже ушёл вперёд на них
+        raise SnapshotError(f"Снимок вмещает не больше {MAX_QUEUED} заранее розданных наборов, "
+                            f"подготовлено {len(queue)}")
+    queued = [_pack_pieces([o.shape for o in orientations], set_colors, palette)
+              for orientations, set_colors in queue]
+
+    seed = game.seed if game.seed is not None and 0 <= game.seed < 1 << 64 else None
+    version, words, gauss = rng_state
+    parts = [
+        HEADER.pack(MAGIC, VERSION, size, int(game.uniform_color), *game.block_color,
+                    ENGINE_CODES.index(game.engine), seed is not None, seed or 0,
+                    game.score, game.moves, game.lines_cleared),
+        bits.to_bytes((size * size + 7) // 8, 'little'),
+        PALETTE_HEADER.pack(len(palette.colors), 1 if len(palette.colors) <= 256 else 2),
+        bytes(component for color in palette.colors for component in color),
+        array('B' if len(palette.colors) <= 256 else 'H', cell_colors).tobytes(),
+        bytes([len(game.pieces)]), pieces,
+        bytes([len(queued)]), b''.join(queued),
+        RNG_STATE.pack(version, *words, gauss is not None, gauss or 0.0)
+    ]
+    return b''.join(parts)
+
+
+def unpack_game(data):
+    """Собирает Game из снимка; раздача продолжится так же, как в исходной игре"""
+    try:
+        (magic, version, size, uniform_color, r, g, b, engine, has_seed, seed,
+         score, moves, lines_cleared) = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise SnapshotError("Это не снимок «Блок Бласт!»")
+        if version != VERSION:
+            raise SnapshotError(f"Неизвестная версия снимка: {version}")
+        if not 1 <= size <= MAX_SIZE:
+            raise SnapshotError(f"Недопустимый размер поля: {size}")
+        if engine >= len(ENGINE_CODES):
+            raise SnapshotError(f"Неизвестный движок поля: {engine}")
+        offset = HEADER.size
+
+        board_bytes = (size * size + 7) // 8
+        bits = int.from_bytes(data[offset:offset + board_bytes], 'little')
+        offset += board_bytes
+
+        palette_size, width = PALETTE_HEADER.unpack_from(data, offset)
+        offset += PALETTE_HEADER.size
+        palette = [tuple(data[offset + 3 * i:offset + 3 * i + 3]) for i in range(palette_size)]
+        offset += 3 * palette_size
+        cell_indexes = array('B' if width == 1 else 'H')
+        occupied = [index for index in range(size * size) if bits >> index & 1]
+        cell_indexes.frombytes(data[offset:offset + width * len(occupied)])
+        offset += width * len(occupied)
+        colors = [[None] * size for _ in range(size)]
+        for index, color_index in zip(occupied, cell_indexes):
+            colors[index // size][index % size] = palette[color_index]
+
+        pieces, piece_colors, offset = _unpack_pieces(data, offset + 1, data[offset], palette)
+        queue = []
+        queued_sets = data[offset]
+        offset += 1
+        for _ in range(queued_sets):
+            orientations, set_colors, offset = _unpack_pieces(data, offset, PIECES_PER_SET, palette)
+            queue.append((tuple(orientations), tuple(set_colors)))
+
+        rng_fields = RNG_STATE.unpack_from(data, offset)
+        rng_state = (rng_fields[0], tuple(rng_fields[1:626]),
+                     rng_fields[627] if rng_fields[626] else None)
+
+        # Без зерна игра получает свой генератор, иначе Game выдумала бы новое зерно
+        game = Game(size=size, uniform_color=bool(uniform_color), block_color=(r, g, b),
+                    engine=ENGINE_CODES[engine], seed=seed if has_seed else None,
+                    rng=None if has_seed else random.Random())
+        # Испорченное состояние генератора random отвергает с ValueError
+        game.set_rng_state((rng_state, tuple(queue)))
+        game.restore(bits, colors, [o.shape for o in pieces], piece_colors, score, moves, lines_cleared)
+    except SnapshotError:
+        raise
+    except (struct.error, IndexError, KeyError, ValueError) as error:
+        raise SnapshotError(f"Снимок повреждён: {error}") from error
+    return game
+
+
+def save_atomic(path, data):
+    """Пишет data во временный файл рядом с path и заменяет им path"""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+def load_game(path):
+    with open(path, 'rb') as f:
+        return unpack_game(f.read())
+
+
+_NOTHING = object()
+
+
+class Autosaver:
+    """Пишет снимки в файл в фоновом потоке.
+
+    submit() только кладёт снимок в очередь из одного места и сразу
+    возвращается. Если снимки приходят быстрее, чем пишутся, промежуточные
+    пропускаются: записывается только последний. submit(None) удаляет файл.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.submitted = 0
+        self.writes = 0
+        self.error = None
+        self._pending = _NOTHING
+        self._closed = False
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name='autosave', daemon=True)
+        self._thread.start()
+
+    def submit(self, data):
+        with self._condition:
+            self._pending = data
+            self.submitted += 1
+            self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._pending is _NOTHING and not self._closed:
+                    self._condition.wait()
+                if self._pending is _NOTHING:
+                    return
+                data, self._pending = self._pending, _NOTHING
+            try:
+                if data is None:
+                    if os.path.exists(self.path):
+                        os.remove(self.path)
+                else:
+                    save_atomic(self.path, data)
+                self.writes += 1
+            except OSError as error:
+                # Сбой записи не должен останавливать игру; следующий снимок попробует снова
+                self.error = error
+
+    def close(self):
+        """Дописывает последний снимок и останавливает поток"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._thread.join()